@@ -1,22 +1,747 @@
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.constants import ClientFlag
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.csv as pa_csv
+import os
+import re
 import io
+import tempfile
+import json
+import random
+import time
+import hashlib
+import itertools
+import threading
+import sys
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# SQL script reading is shared by the apps and lives at the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from sql_scripts import INSERT_STATEMENT, execute_statements, iter_sql_statements
+
+# Number of server connections kept per (host, user) pool; override with MYSQL_POOL_SIZE
+POOL_SIZE = min(max(int(os.getenv("MYSQL_POOL_SIZE", "5")), 1), pooling.CNX_POOL_MAXSIZE)
+# Seconds to wait for a free pooled connection before giving up
+POOL_WAIT_TIMEOUT = float(os.getenv("MYSQL_POOL_WAIT_TIMEOUT", "10"))
+# Allow LOAD DATA LOCAL INFILE for file imports (the server must also enable local_infile)
+ALLOW_LOCAL_INFILE = os.getenv("MYSQL_ALLOW_LOCAL_INFILE", "0").lower() in ("1", "true", "yes")
+# Seconds before cached schema metadata is reloaded from the server
+CATALOG_TTL = float(os.getenv("MYSQL_CATALOG_TTL", "300"))
+
+# Registries shared by every session. The app script is executed again on each rerun, which would
+# re-create its module globals, so they are kept in Streamlit's resource cache instead
+@st.cache_resource
+def shared_registry(name):
+    return {}, threading.Lock()
+
+@st.cache_resource
+def shared_counter(name):
+    return itertools.count(1)
+
+# Connection pools shared by every session, keyed by (host, user)
+_connection_pools, _connection_pools_lock = shared_registry("connection_pools")
+_pool_counter = shared_counter("connection_pools")
+
+# Function to get (or create) the connection pool for a host and user
+def get_connection_pool(host, username, password):
+    key = (host, username)
+    password_digest = hashlib.sha256(password.encode("utf-8")).hexdigest()
+    with _connection_pools_lock:
+        pool, pool_password_digest = _connection_pools.get(key, (None, None))
+        # A new password (e.g. after a reset) gets a fresh pool
+        if pool is None or pool_password_digest != password_digest:
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"mysql_operations_{next(_pool_counter)}",
+                pool_size=POOL_SIZE,
+                # Resetting the session on every return would also drop the prepared statements
+                # that reruns reuse; pooled_connection rolls back instead (and resets after jobs)
+                pool_reset_session=False,
+                **connection_settings(host, username, password)
+            )
+            _connection_pools[key] = (pool, password_digest)
+        return pool
+
+# Function to get the connection arguments shared by pooled and dedicated connections
+def connection_settings(host, username, password):
+    return {
+        "allow_local_infile": ALLOW_LOCAL_INFILE,
+        # UPDATE row counts report matched rows, which the grid's concurrency checks rely on
+        "client_flags": [ClientFlag.FOUND_ROWS],
+        "host": host,
+        "user": username,
+        "password": password,
+    }
+
+# Function to check out a live connection from a pool and return it when done. Connections that
+# ran arbitrary statements (scripts, jobs) reset their session so its settings do not leak.
+@contextmanager
+def pooled_connection(pool, reset_session=False):
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+    while True:
+        try:
+            db_connection = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            # Every connection is checked out by other sessions; wait for one to come back
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        # Reconnect if the server dropped the idle connection (e.g. after wait_timeout)
+        db_connection.ping(reconnect=True, attempts=3, delay=1)
+        yield db_connection
+    finally:
+        try:
+            if reset_session:
+                db_connection.reset_session()
+                # The reset deallocated the session's prepared statements and may have changed its database
+                forget_prepared_statements(db_connection)
+                forget_session_database(db_connection)
+                forget_fresh_table_stats(db_connection)
+            else:
+                db_connection.rollback()
+        except mysql.connector.Error:
+            # A broken connection reconnects (as a new session) on its next checkout
+            pass
+        try:
+            # Returns the connection to the pool
+            db_connection.close()
+        except mysql.connector.Error:
+            # The connection is back in the pool anyway; a broken one reconnects on its next checkout
+            pass
+
+# Schema metadata cache with a time to live, loaded with two INFORMATION_SCHEMA queries per database
+class SchemaCatalog:
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._databases = None
+        self._schemas = {}
+
+    def _is_fresh(self, entry):
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def databases(self, mycursor):
+        with self._lock:
+            if not self._is_fresh(self._databases):
+                mycursor.execute("SHOW DATABASES")
+                self._databases = (time.monotonic(), [db[0] for db in mycursor.fetchall()])
+            return self._databases[1]
+
+    def tables(self, database, mycursor):
+        return list(self._schema(database, mycursor))
+
+    def table(self, database, table, mycursor):
+        empty = {"columns": [], "data_types": {}, "primary_keys": [], "nullable": set(), "indexes": {}}
+        return self._schema(database, mycursor).get(table, empty)
+
+    def _schema(self, database, mycursor):
+        with self._lock:
+            entry = self._schemas.get(database)
+            if not self._is_fresh(entry):
+                entry = (time.monotonic(), self._load_schema(database, mycursor))
+                self._schemas[database] = entry
+            return entry[1]
+
+    def _load_schema(self, database, mycursor):
+        # Columns, types and primary key positions of every table in one round trip
+        mycursor.execute(
+            "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE, k.ORDINAL_POSITION "
+            "FROM INFORMATION_SCHEMA.COLUMNS c "
+            "LEFT JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE k "
+            "ON k.TABLE_SCHEMA = c.TABLE_SCHEMA AND k.TABLE_NAME = c.TABLE_NAME "
+            "AND k.COLUMN_NAME = c.COLUMN_NAME AND k.CONSTRAINT_NAME = 'PRIMARY' "
+            "WHERE c.TABLE_SCHEMA = %s "
+            "ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION",
+            (database,)
+        )
+        schema = {}
+        key_positions = {}
+        for table_name, column_name, data_type, is_nullable, key_position in mycursor.fetchall():
+            table = schema.setdefault(table_name, {"columns": [], "data_types": {}, "primary_keys": [],
+                                                   "nullable": set(), "indexes": {}})
+            table["columns"].append(column_name)
+            table["data_types"][column_name] = data_type
+            if is_nullable == "YES":
+                table["nullable"].add(column_name)
+            if key_position is not None:
+                key_positions.setdefault(table_name, []).append((key_position, column_name))
+        for table_name, positions in key_positions.items():
+            schema[table_name]["primary_keys"] = [column_name for _, column_name in sorted(positions)]
+
+        # Column order of every index, used to tell which filters can use an index
+        mycursor.execute(
+            "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            (database,)
+        )
+        for table_name, index_name, column_name in mycursor.fetchall():
+            if table_name in schema and column_name is not None:
+                # Functional index parts have no column name and are skipped
+                schema[table_name]["indexes"].setdefault(index_name, []).append(column_name)
+        return schema
+
+    def invalidate(self, database=None):
+        # Forget one database (and the database list), or everything when no database is given
+        with self._lock:
+            self._databases = None
+            if database is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop(database, None)
+
+# Schema catalogs shared by every session, keyed by (host, user)
+_schema_catalogs, _schema_catalogs_lock = shared_registry("schema_catalogs")
+
+# Statements kept per rerun in the query log (totals still count every statement)
+QUERY_LOG_STATEMENTS = 1000
+# Reruns kept in the query log of a session
+QUERY_LOG_RERUNS = 50
+# Characters of statement text kept per logged statement
+QUERY_LOG_SQL_LENGTH = 10000
+USE_STATEMENT = re.compile(r"^\s*USE\s+`?([^`\s;]+)`?", re.IGNORECASE)
+EXPLAINABLE_STATEMENT = re.compile(r"^\s*(?:SELECT|WITH|TABLE|UPDATE|DELETE|INSERT|REPLACE)\b", re.IGNORECASE)
+
+# Connection wrapper whose cursors record every statement in a rerun's query log
+class InstrumentedConnection:
+    def __init__(self, connection, rerun_log):
+        self._connection = connection
+        self.rerun_log = rerun_log
+        # Tracked from USE statements so logged statements can be explained in the right database
+        self.current_database = None
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs), self, kwargs.get("prepared", False))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+# Cursor wrapper recording statement text, latency, rows and bytes fetched. A prepared cursor's statement is
+# its %s template, so the parameters bound to it are recorded too.
+class InstrumentedCursor:
+    def __init__(self, cursor, connection, prepared=False):
+        self._cursor = cursor
+        self._connection = connection
+        self._prepared = prepared
+        self._entry = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def execute(self, operation, *args, **kwargs):
+        started_at = time.perf_counter()
+        error = None
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        except mysql.connector.Error as err:
+            error = err
+            raise
+        finally:
+            params = args[0] if args else kwargs.get("params")
+            self._log_statement(operation, started_at, error, params if self._prepared else None)
+
+    def executemany(self, operation, seq_params):
+        started_at = time.perf_counter()
+        error = None
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        except mysql.connector.Error as err:
+            error = err
+            raise
+        finally:
+            self._log_statement(operation, started_at, error)
+
+    def fetchone(self):
+        started_at = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._log_fetch([row] if row is not None else [], started_at)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._log_fetch(rows, started_at)
+        return rows
+
+    def fetchall(self):
+        started_at = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._log_fetch(rows, started_at)
+        return rows
+
+    def _log_statement(self, operation, started_at, error, params=None):
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        operation = operation.decode("utf-8", "replace") if isinstance(operation, bytes) else str(operation)
+        use = USE_STATEMENT.match(operation)
+        if use and error is None:
+            self._connection.current_database = use.group(1)
+            # A USE from a script or the query log moves the session too
+            remember_session_database(self._connection, use.group(1))
+        # The interpolated statement when the cursor has one, so it can be explained as logged
+        statement = getattr(self._cursor, "statement", None) or operation
+        if isinstance(statement, bytes):
+            statement = statement.decode("utf-8", "replace")
+        rows = 0
+        if error is None and not getattr(self._cursor, "with_rows", False):
+            rows = max(getattr(self._cursor, "rowcount", 0) or 0, 0)
+        rerun_log = self._connection.rerun_log
+        totals = rerun_log["totals"]
+        totals["statements"] += 1
+        totals["latency_ms"] += latency_ms
+        totals["rows"] += rows
+        self._entry = None
+        if len(rerun_log["statements"]) < QUERY_LOG_STATEMENTS:
+            self._entry = {"sql": statement[:QUERY_LOG_SQL_LENGTH], "database": self._connection.current_database,
+                           "latency_ms": latency_ms, "rows": rows, "bytes": 0,
+                           "error": str(error) if error is not None else None}
+            if params:
+                self._entry["params"] = list(params)
+            rerun_log["statements"].append(self._entry)
+
+    def _log_fetch(self, rows, started_at):
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        # Approximate payload size: text and binary lengths, 8 bytes for other values
+        size = sum(len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+                   for row in rows for value in row)
+        totals = self._connection.rerun_log["totals"]
+        totals["latency_ms"] += latency_ms
+        totals["rows"] += len(rows)
+        totals["bytes"] += size
+        if self._entry is not None:
+            self._entry["latency_ms"] += latency_ms
+            self._entry["rows"] += len(rows)
+            self._entry["bytes"] += size
+
+# Function to start the query log of the current rerun
+def start_query_log_rerun():
+    session_state = st.session_state
+    if "query_log" not in session_state:
+        session_state.query_log = []
+        session_state.query_log_reruns = 0
+    session_state.query_log_reruns += 1
+    rerun_log = {"rerun": session_state.query_log_reruns, "started_at": time.time(),
+                 "totals": {"statements": 0, "latency_ms": 0.0, "rows": 0, "bytes": 0}, "statements": []}
+    session_state.query_log.append(rerun_log)
+    del session_state.query_log[:-QUERY_LOG_RERUNS]
+    return rerun_log
+
+# Function to show the query log of the current rerun in the sidebar
+def query_log_panel(db_connection):
+    rerun_log = db_connection.rerun_log
+    totals = rerun_log["totals"]
+    with st.sidebar.expander("Query Log"):
+        st.write(f"Rerun {rerun_log['rerun']}: {totals['statements']} statements, "
+                 f"{totals['latency_ms']:,.1f} ms, {totals['rows']:,} rows, {totals['bytes'] / 1024:,.1f} KB")
+
+        # Show the plan requested with a button on the previous rerun
+        explain_entry = st.session_state.pop("query_log_explain", None)
+        if explain_entry is not None:
+            st.write("EXPLAIN")
+            st.code(explain_entry["sql"], language="sql")
+            if explain_entry.get("params"):
+                st.caption(f"Parameters: {explain_entry['params']}")
+            try:
+                st.dataframe(explain_statement(db_connection, explain_entry), hide_index=True)
+            except mysql.connector.Error as err:
+                st.error(f"Error: {err}")
+
+        slowest = sorted(rerun_log["statements"], key=lambda entry: entry["latency_ms"], reverse=True)[:5]
+        for i, entry in enumerate(slowest):
+            st.caption(f"{entry['latency_ms']:,.1f} ms, {entry['rows']:,} rows")
+            st.code(entry["sql"][:500], language="sql")
+            if entry.get("params"):
+                st.caption(f"Parameters: {entry['params']}"[:500])
+            if EXPLAINABLE_STATEMENT.match(entry["sql"]):
+                st.button("EXPLAIN", key=f"query_log_explain_{i}",
+                          on_click=lambda entry=entry: st.session_state.update(query_log_explain=entry))
+
+        # Every rerun of the session as JSON lines, one statement per line
+        lines = (json.dumps({"rerun": log["rerun"], "started_at": log["started_at"], **entry}, default=str)
+                 for log in st.session_state.query_log for entry in log["statements"])
+        st.download_button("Export Log (JSON Lines)", "\n".join(lines), file_name="query_log.jsonl",
+                           mime="application/jsonl")
+
+# Function to run EXPLAIN for a logged statement in the database it ran in
+def explain_statement(db_connection, entry):
+    mycursor = db_connection.cursor()
+    try:
+        if entry["database"]:
+            mycursor.execute(f"USE {quote_identifier(entry['database'])}")
+        # A prepared statement's template is explained with the parameters it ran with, bound client side
+        mycursor.execute(f"EXPLAIN {entry['sql']}", tuple(entry.get("params") or ()))
+        columns = [desc[0] for desc in mycursor.description]
+        return pd.DataFrame(mycursor.fetchall(), columns=columns)
+    finally:
+        mycursor.close()
+
+# Prepared statements kept open per server connection
+PREPARED_STATEMENTS = max(int(os.getenv("MYSQL_PREPARED_STATEMENTS", "64")), 1)
+
+# Prepared cursors of one server session, one per statement text; the least recently used is closed first
+class PreparedStatements:
+    def __init__(self, connection_id, size=PREPARED_STATEMENTS):
+        self.connection_id = connection_id
+        self.size = size
+        self._cursors = OrderedDict()
+
+    def get(self, connection, sql):
+        entry = self._cursors.get(sql)
+        if entry is not None:
+            self._cursors.move_to_end(sql)
+            return entry
+        # A prepared cursor re-prepares unless it executes the very string object it prepared,
+        # so the cached text is returned along with the cursor
+        entry = (sql, connection.cursor(prepared=True))
+        self._cursors[sql] = entry
+        while len(self._cursors) > self.size:
+            _, (_, cursor) = self._cursors.popitem(last=False)
+            try:
+                # Deallocates the statement on the server
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        return entry
+
+# Function to get the connection underneath the query log and pool wrappers
+def raw_connection(db_connection):
+    if isinstance(db_connection, InstrumentedConnection):
+        db_connection = db_connection._connection
+    return getattr(db_connection, "_cnx", None) or db_connection
+
+# Function to execute a statement as a server-side prepared statement, prepared once per
+# connection and statement text; the returned cursor is shared, so read its rows but do not close it
+def execute_prepared(db_connection, sql, params=()):
+    connection = raw_connection(db_connection)
+    statements = getattr(connection, "prepared_statements", None)
+    if statements is None or statements.connection_id != connection.connection_id:
+        # A reconnect starts a new session without the old statements
+        statements = PreparedStatements(connection.connection_id)
+        connection.prepared_statements = statements
+    sql, cursor = statements.get(connection, sql)
+    if isinstance(db_connection, InstrumentedConnection):
+        cursor = InstrumentedCursor(cursor, db_connection, prepared=True)
+    cursor.execute(sql, tuple(params))
+    return cursor
+
+# Function to drop the prepared statements of a connection whose session was reset
+def forget_prepared_statements(db_connection):
+    raw_connection(db_connection).prepared_statements = None
+
+# Function to make a database the session's default. A pooled session keeps its database between
+# reruns, so the USE is only sent when the server session is on another one.
+def use_database(mycursor, db_connection, selected_database):
+    connection = raw_connection(db_connection)
+    if getattr(connection, "session_database", None) == (connection.connection_id, selected_database):
+        if isinstance(db_connection, InstrumentedConnection):
+            db_connection.current_database = selected_database
+        return
+    mycursor.execute(f"USE {quote_identifier(selected_database)}")
+    remember_session_database(db_connection, selected_database)
+
+# Function to record the database a server session is on; a reconnect (new connection id) forgets it
+def remember_session_database(db_connection, selected_database):
+    connection = raw_connection(db_connection)
+    connection.session_database = (connection.connection_id, selected_database)
+
+# Function to forget the database of a connection whose session was reset
+def forget_session_database(db_connection):
+    raw_connection(db_connection).session_database = None
+
+# Function to make a server session read table statistics from the engine. The setting is tried once per
+# server session, so a server without it (older MySQL, MariaDB) only rejects it once per pooled connection.
+def use_fresh_table_stats(mycursor, db_connection):
+    connection = raw_connection(db_connection)
+    if getattr(connection, "fresh_table_stats", None) == connection.connection_id:
+        return
+    try:
+        # MySQL 8 caches these statistics for a day by default; read them from the engine instead
+        mycursor.execute("SET SESSION information_schema_stats_expiry = 0")
+    except mysql.connector.Error:
+        # Older MySQL and MariaDB always read them from the engine
+        pass
+    connection.fresh_table_stats = connection.connection_id
+
+# Function to forget the statistics setting of a connection whose session was reset
+def forget_fresh_table_stats(db_connection):
+    raw_connection(db_connection).fresh_table_stats = None
+
+# Worker threads running background jobs for each (host, user)
+JOB_WORKERS = max(int(os.getenv("MYSQL_JOB_WORKERS", "2")), 1)
+# Finished jobs kept in the job list
+JOBS_KEPT = 50
+# Seconds between refreshes of the job list
+JOB_POLL_INTERVAL = 2
+
+# Raised inside a job when the user cancels it
+class JobCancelled(Exception):
+    pass
+
+# A long-running operation executed by a worker thread on its own pooled connection
+class Job:
+    def __init__(self, job_id, description, work, after=None, pooled=True):
+        self.id = job_id
+        self.description = description
+        self.work = work
+        self.after = after
+        # Jobs that open their own connections do not hold one of the pool's
+        self.pooled = pooled
+        self.status = "queued"
+        self.stage = ""
+        self.progress = None
+        self.error = None
+        self.connection_id = None
+        self.cancel_requested = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled("Cancelled by user")
+
+# Background job queue shared by the sessions of one (host, user)
+class JobRunner:
+    def __init__(self, pool):
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="mysql_job")
+        self._jobs = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, description, work, after=None, pooled=True):
+        with self._lock:
+            job = Job(next(self._ids), description, work, after, pooled)
+            finished = [old for old in self._jobs if not old.active]
+            for old in finished[:-JOBS_KEPT]:
+                self._jobs.remove(old)
+            self._jobs.append(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return list(reversed(self._jobs))
+
+    def _run(self, job):
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            if job.pooled:
+                with pooled_connection(self.pool, reset_session=True) as db_connection:
+                    job.connection_id = db_connection.connection_id
+                    job.work(job, db_connection)
+            else:
+                job.work(job, None)
+            job.status = "succeeded"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as err:
+            # KILL QUERY surfaces as an "interrupted" error on the job's connection
+            job.status = "cancelled" if job.cancel_requested else "failed"
+            job.error = str(err)
+        finally:
+            job.connection_id = None
+            job.finished_at = time.time()
+            if job.after:
+                try:
+                    job.after(job)
+                except Exception:
+                    pass
+
+    def cancel(self, job, mycursor):
+        job.cancel_requested = True
+        connection_id = job.connection_id
+        if connection_id:
+            # Stops the running statement; the job's connection stays usable
+            mycursor.execute(f"KILL QUERY {int(connection_id)}")
+
+# Job runners shared by every session, keyed by (host, user)
+_job_runners, _job_runners_lock = shared_registry("job_runners")
+
+# Function to get the job runner of the logged in user
+def get_job_runner():
+    session_state = st.session_state
+    key = (session_state.host, session_state.username)
+    with _job_runners_lock:
+        if key not in _job_runners:
+            _job_runners[key] = JobRunner(session_state.db_pool)
+        runner = _job_runners[key]
+        # Follow the pool of the latest login (a password reset creates a new pool)
+        runner.pool = session_state.db_pool
+        return runner
+
+# Function to build a job that runs statements in a database, committing after each one
+def statements_job(selected_database, statements):
+    def work(job, db_connection):
+        mycursor = db_connection.cursor()
+        try:
+            mycursor.execute(f"USE {quote_identifier(selected_database)}")
+            for statement in statements:
+                job.check_cancelled()
+                job.stage = statement
+                mycursor.execute(statement)
+                db_connection.commit()
+        finally:
+            mycursor.close()
+    return work
+
+# Function to read stage progress of running statements from performance_schema, keyed by connection id
+def get_stage_progress(mycursor, connection_ids):
+    if not connection_ids:
+        return {}
+    try:
+        mycursor.execute(
+            "SELECT t.PROCESSLIST_ID, s.EVENT_NAME, s.WORK_COMPLETED, s.WORK_ESTIMATED "
+            "FROM performance_schema.events_stages_current s "
+            "JOIN performance_schema.threads t ON t.THREAD_ID = s.THREAD_ID "
+            f"WHERE t.PROCESSLIST_ID IN ({', '.join(['%s'] * len(connection_ids))})",
+            tuple(connection_ids)
+        )
+        return {row[0]: row[1:] for row in mycursor.fetchall()}
+    except mysql.connector.Error:
+        # performance_schema is disabled or not readable by this user
+        return {}
+
+# Job list refreshed on its own every few seconds while the rest of the page stays as it is
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def jobs_panel():
+    runner = get_job_runner()
+    jobs = runner.jobs()
+    if not jobs:
+        return
+    active = any(job.active for job in jobs)
+    with st.expander("Background Jobs", expanded=active):
+        if not active:
+            show_jobs(runner, jobs, None)
+            return
+        with panel_connection() as db_connection:
+            mycursor = db_connection.cursor()
+            try:
+                show_jobs(runner, jobs, mycursor)
+            finally:
+                mycursor.close()
+
+# Function to get a connection for the job list: the page's own during a full rerun, so the session never
+# waits on the pool while holding a connection, and a short checkout when only the fragment reruns
+@contextmanager
+def panel_connection():
+    page_connection = st.session_state.get("page_connection")
+    if page_connection is not None:
+        yield page_connection
+        return
+    with pooled_connection(st.session_state.db_pool) as db_connection:
+        yield db_connection
+
+# Function to list jobs with their progress and a Cancel button for active ones
+def show_jobs(runner, jobs, mycursor):
+    running = [job.connection_id for job in jobs if job.status == "running" and job.connection_id]
+    stages = get_stage_progress(mycursor, running) if mycursor else {}
+    for job in jobs:
+        end = job.finished_at or time.time()
+        elapsed = end - (job.started_at or end)
+        st.write(f"**#{job.id}** {job.status} after {elapsed:,.1f}s: `{job.description[:200]}`")
+        stage = stages.get(job.connection_id)
+        if stage and stage[2]:
+            # e.g. stage/innodb/alter table (read PK and internal sort)
+            st.progress(min((stage[1] or 0) / stage[2], 1.0), text=stage[0])
+        elif job.progress is not None and job.active:
+            st.progress(job.progress, text=job.stage)
+        elif job.stage and job.active:
+            st.caption(job.stage[:200])
+        if job.error:
+            st.error(job.error)
+        if mycursor and job.active and not job.cancel_requested:
+            if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                try:
+                    runner.cancel(job, mycursor)
+                except mysql.connector.Error as err:
+                    st.error(f"Error: {err}")
+
+# Memory for cached table pages of each (host, user), in MB
+RESULT_CACHE_MB = float(os.getenv("MYSQL_RESULT_CACHE_MB", "64"))
+
+# LRU cache of fetched table pages, bounded in bytes; entries carry the table version they were read at
+class ResultCache:
+    def __init__(self, max_bytes=RESULT_CACHE_MB * 2**20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                # The table changed since the page was read
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, database=None, table=None):
+        # Keys start with (database, table); no database clears everything
+        with self._lock:
+            for key in list(self._entries):
+                if database is None or (key[0] == database and (table is None or key[1] == table)):
+                    self._remove(key)
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+# Result caches shared by every session, keyed by (host, user)
+_result_caches, _result_caches_lock = shared_registry("result_caches")
+
+# Function to get the result cache of the logged in user
+def get_result_cache():
+    key = (st.session_state.host, st.session_state.username)
+    with _result_caches_lock:
+        if key not in _result_caches:
+            _result_caches[key] = ResultCache()
+        return _result_caches[key]
 
 # Function to authenticate user credentials with MySQL database
 def authenticate(username, password, host):
     try:
-        # Establish connection to MySQL Server
-        mydb = mysql.connector.connect(
-            host=host,
-            user=username,
-            password=password
-        )
-        # Return the connection object along with authentication status
-        if mydb.is_connected():
-            return True, mydb
-        else:
-            return False, None
+        # Get the pool for this host and user; creating it opens the first connections
+        pool = get_connection_pool(host, username, password)
+        with pooled_connection(pool) as mydb:
+            # Return the connection pool along with authentication status
+            if mydb.is_connected():
+                return True, pool
+            else:
+                return False, None
     except mysql.connector.Error as err:
         st.error(f"Error: {err}")
         return False, None
@@ -30,7 +755,7 @@ def reset_password(username, old_password, new_password, host):
             user=username,
             password=old_password
         )
-        mycursor = mydb.cursor()
+        mycursor = InstrumentedCursor(mydb.cursor(), InstrumentedConnection(mydb, start_query_log_rerun()))
 
         # Reset the password for the specified username
         mycursor.execute(f"ALTER USER '{username}'@'{host}' IDENTIFIED BY '{new_password}'")
@@ -85,10 +810,10 @@ def main():
                 reset_password_panel(session_state.host)
 
         if st.button("Login"):
-            authenticated, db_connection = authenticate(username, password, session_state.host)
+            authenticated, db_pool = authenticate(username, password, session_state.host)
             if authenticated:
                 session_state.authenticated = True
-                session_state.db_connection = db_connection
+                session_state.db_pool = db_pool
                 session_state.username = username
                 session_state.password = password
                 st.success("Login Successful!")
@@ -99,10 +824,25 @@ def main():
         # Add logout button in side panel
         if st.sidebar.button("Logout", help="Click to logout"):
             session_state.authenticated = False
-            st.experimental_rerun()
+            st.rerun()
 
         st.sidebar.subheader("Database Operations")
-        perform_operations(session_state.db_connection)
+        if st.sidebar.button("Refresh Schema", help="Reload databases, tables and columns from the server"):
+            get_schema_catalog().invalidate()
+        try:
+            # Each rerun borrows a connection from the shared pool and returns it at the end
+            with pooled_connection(session_state.db_pool) as db_connection:
+                # Every statement of this rerun goes through an instrumented cursor
+                db_connection = InstrumentedConnection(db_connection, start_query_log_rerun())
+                # Only set while this rerun holds the connection; fragment reruns find it cleared
+                session_state.page_connection = db_connection
+                try:
+                    perform_operations(db_connection)
+                    query_log_panel(db_connection)
+                finally:
+                    session_state.page_connection = None
+        except mysql.connector.Error as err:
+            st.error(f"Error: {err}")
 
 # Panel for resetting password
 def reset_password_panel(host):
@@ -127,6 +867,7 @@ def reset_password_panel(host):
 # Function to perform database operations
 def perform_operations(db_connection):
     mycursor = db_connection.cursor()
+    jobs_panel()
     
     # Checkbox for uploading MySQL script file
     upload_sql_script = st.sidebar.checkbox("Upload MySQL Script File")
@@ -134,8 +875,22 @@ def perform_operations(db_connection):
         upload_sql_script = st.file_uploader("Upload SQL Script", type=['sql'])
         
         if upload_sql_script is not None:
-            if st.button("Execute Script"):
-                execute_sql_script(upload_sql_script, mycursor, db_connection)
+            batch_size = st.number_input("INSERT Statements per Batch", min_value=1, max_value=10000, value=SCRIPT_BATCH_SIZE)
+            commit_interval = st.number_input("Commit Every N Statements", min_value=1, value=SCRIPT_COMMIT_INTERVAL)
+            run_on = st.radio("Run On", ("Current Connection", "Several Databases", "Several Hosts"), horizontal=True)
+            if run_on == "Current Connection":
+                committed = st.session_state.get("script_progress", {}).get(script_progress_key(upload_sql_script), 0)
+                resume = False
+                if committed:
+                    resume = st.checkbox(f"Resume after the {committed} statements committed by the last run", value=True)
+                if st.button("Execute Script"):
+                    execute_sql_script(upload_sql_script, mycursor, db_connection, batch_size, commit_interval,
+                                       committed if resume else 0)
+            else:
+                targets = select_script_targets(run_on, mycursor)
+                if st.button("Execute Script", disabled=not targets):
+                    execute_sql_script_fanout(upload_sql_script, targets, batch_size, commit_interval)
+                fanout_results_panel(upload_sql_script, batch_size, commit_interval)
 
     # Checkbox for managing database
     manage_database = st.sidebar.checkbox("Manage Database")
@@ -145,40 +900,250 @@ def perform_operations(db_connection):
         perform_crud_operations(mycursor, db_connection)
 
 # Function to execute SQL script
-def execute_sql_script(uploaded_file, mycursor, db_connection):
-    try:
-        # Read the content of the uploaded file
-        content_str = io.StringIO(uploaded_file.getvalue().decode("utf-8")).read()
-        # Split the content into individual queries
-        queries = content_str.split(';')
-        # Execute each query
-        for query in queries:
-            if query.strip():
-                mycursor.execute(query)
+def execute_sql_script(uploaded_file, mycursor, db_connection, batch_size=None, commit_interval=None, start_at=0):
+    key = script_progress_key(uploaded_file)
+    # Plain objects the worker thread can update without touching st.session_state
+    saved_progress = st.session_state.setdefault("script_progress", {})
+    catalog = get_schema_catalog()
+
+    def work(job, db_connection):
+        progress = new_script_progress(uploaded_file)
+
+        def track(progress):
+            job.progress = min(progress["bytes_read"] / max(progress["total_bytes"], 1), 1.0)
+            job.stage = describe_script_progress(progress)
+            job.check_cancelled()
+
+        try:
+            run_sql_script(uploaded_file, db_connection, progress, batch_size, commit_interval, start_at, track)
+            saved_progress.pop(key, None)
+        except BaseException:
+            # Remember how far the script got so the next run can resume after the last commit
+            saved_progress[key] = progress["committed"]
+            raise
+
+    # The script may have run DDL or DML on any database
+    result_cache = get_result_cache()
+    job = get_job_runner().submit(f"Execute script {uploaded_file.name}", work,
+                                  after=lambda job: (catalog.invalidate(), result_cache.invalidate()))
+    st.info(f"Started job #{job.id}. Follow it under Background Jobs.")
+
+# Scripts run on this many targets at once, each on a connection of its own
+FANOUT_WORKERS = max(int(os.getenv("MYSQL_FANOUT_WORKERS", "8")), 1)
+
+# Function to choose the databases or hosts a script runs on, as (host, database) targets
+def select_script_targets(run_on, mycursor):
+    session_state = st.session_state
+    if run_on == "Several Databases":
+        databases = st.multiselect("Databases", get_all_databases(mycursor))
+        return [(session_state.host, database) for database in databases]
+    hosts = st.text_area("Hosts (one per line)", help=f"Logged in as {session_state.username} on every host")
+    database = st.text_input("Database", placeholder="None: the script selects its own")
+    return [(host, database or None) for host in dict.fromkeys(line.strip() for line in hosts.splitlines()) if host]
+
+# Function to execute an uploaded script on several targets as one background job
+def execute_sql_script_fanout(uploaded_file, targets, batch_size=None, commit_interval=None, start_at=None):
+    session_state = st.session_state
+    username, password = session_state.username, session_state.password
+    # Per-target results; shown (and retried) from the upload panel
+    results = session_state.setdefault("fanout_results", {}).setdefault(script_progress_key(uploaded_file), {})
+    for target in targets:
+        results[target] = {"status": "queued", "statements": 0, "committed": 0, "error": None}
+    start_at = start_at or {}
+
+    def run_target(job, target, script):
+        host, database = target
+        result = results[target]
+        progress = new_script_progress(uploaded_file)
+        if job.cancel_requested:
+            result["status"] = "cancelled"
+            return
+        result["status"] = "running"
+
+        def track(progress):
+            result["statements"] = progress["statements"]
+            job.check_cancelled()
+
+        try:
+            db_connection = mysql.connector.connect(**connection_settings(host, username, password))
+            try:
+                if database:
+                    mycursor = db_connection.cursor()
+                    mycursor.execute(f"USE {quote_identifier(database)}")
+                    mycursor.close()
+                # Each target streams the script through a reader of its own over the uploaded bytes
+                run_sql_script(uploaded_file, db_connection, progress, batch_size, commit_interval,
+                               start_at.get(target, 0), track, iter_sql_statements(io.BytesIO(script)))
+            finally:
+                db_connection.close()
+            result["status"] = "succeeded"
+        except Exception as err:
+            # Checked by attribute: a job submitted in an earlier rerun raises that rerun's JobCancelled
+            if job.cancel_requested:
+                result["status"] = "cancelled"
+            else:
+                result["status"] = "failed"
+                result["error"] = str(err)
+        finally:
+            result["statements"] = progress["statements"]
+            result["committed"] = progress["committed"]
+
+    def work(job, db_connection):
+        # The upload is already held in memory; the targets share its bytes, not a parsed copy
+        script = uploaded_file.getvalue()
+        with ThreadPoolExecutor(max_workers=min(FANOUT_WORKERS, len(targets)),
+                                thread_name_prefix="mysql_fanout") as executor:
+            futures = [executor.submit(run_target, job, target, script) for target in targets]
+            while True:
+                finished = sum(future.done() for future in futures)
+                job.progress = finished / len(targets)
+                job.stage = describe_fanout_results(results, targets)
+                if finished == len(targets):
+                    break
+                time.sleep(0.5)
+        job.check_cancelled()
+        failed = [target for target in targets if results[target]["status"] == "failed"]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(targets)} targets failed")
+
+    def after(job):
+        for host, database in targets:
+            invalidate_shared_caches(host, username, database)
+
+    description = f"Execute script {uploaded_file.name} on {len(targets)} targets"
+    job = get_job_runner().submit(description, work, after=after, pooled=False)
+    st.info(f"Started job #{job.id}. Follow it under Background Jobs.")
+
+# Function to count script targets by status
+def describe_fanout_results(results, targets):
+    counts = {}
+    for target in targets:
+        counts[results[target]["status"]] = counts.get(results[target]["status"], 0) + 1
+    return ", ".join(f"{count} {status}" for status, count in counts.items())
+
+# Function to show the per-target results of the last fan-out run of a script, with a retry for failures
+def fanout_results_panel(uploaded_file, batch_size, commit_interval):
+    results = st.session_state.get("fanout_results", {}).get(script_progress_key(uploaded_file))
+    if not results:
+        return
+    st.dataframe(pd.DataFrame(
+        [(host, database or "", result["status"], result["statements"], result["committed"], result["error"] or "")
+         for (host, database), result in results.items()],
+        columns=["Host", "Database", "Status", "Statements", "Committed", "Error"]
+    ), hide_index=True)
+    failed = [target for target, result in results.items() if result["status"] in ("failed", "cancelled")]
+    if failed and not any(result["status"] in ("queued", "running") for result in results.values()):
+        # Each target resumes after the statements it committed before failing
+        if st.button(f"Retry {len(failed)} Failed Targets"):
+            execute_sql_script_fanout(uploaded_file, failed, batch_size, commit_interval,
+                                      {target: results[target]["committed"] for target in failed})
+
+# Function to invalidate the schema catalog and result cache of a (host, user), if they exist
+def invalidate_shared_caches(host, username, database=None):
+    with _schema_catalogs_lock:
+        catalog = _schema_catalogs.get((host, username))
+    with _result_caches_lock:
+        result_cache = _result_caches.get((host, username))
+    if catalog:
+        catalog.invalidate(database)
+    if result_cache:
+        result_cache.invalidate(database)
+
+# Defaults for script execution: INSERTs sent per multi-statement round trip, statements per commit
+SCRIPT_BATCH_SIZE = 100
+SCRIPT_COMMIT_INTERVAL = 1000
+# Session statements that are replayed even when resuming past them
+SESSION_STATEMENT = re.compile(r"^(?:/\*!\d*\s*)?(?:SET|USE)\b", re.IGNORECASE)
+
+# Function to identify an uploaded script for resuming
+def script_progress_key(uploaded_file):
+    return f"{uploaded_file.name}:{uploaded_file.size}"
+
+# Function to create the progress record of a script run
+def new_script_progress(uploaded_file):
+    return {"bytes_read": 0, "total_bytes": uploaded_file.size, "statements": 0, "committed": 0,
+            "started_at": time.monotonic()}
+
+# Function to describe script progress as bytes and statements per second
+def describe_script_progress(progress):
+    elapsed = max(time.monotonic() - progress["started_at"], 1e-6)
+    return (f"{progress['bytes_read'] / 2**20:,.1f} of {progress['total_bytes'] / 2**20:,.1f} MB "
+            f"({progress['bytes_read'] / 2**20 / elapsed:,.1f} MB/s), "
+            f"{progress['statements']:,} statements ({progress['statements'] / elapsed:,.0f}/s), "
+            f"{progress['committed']:,} committed")
+
+# Function to stream an uploaded SQL script into batched, periodically committed statements
+def run_sql_script(uploaded_file, db_connection, progress, batch_size=None, commit_interval=None, start_at=0,
+                   on_progress=None, statements=None):
+    # 'statements' are (statement, bytes read) pairs read from the file by the caller
+    if statements is None:
+        statements = iter_sql_statements(uploaded_file)
+    batch_size = batch_size or SCRIPT_BATCH_SIZE
+    commit_interval = commit_interval or SCRIPT_COMMIT_INTERVAL
+    mycursor = db_connection.cursor()
+    batch = []
+    uncommitted = 0
+
+    def flush():
+        if batch:
+            execute_statements(mycursor, batch)
+            batch.clear()
+
+    def commit():
+        flush()
         db_connection.commit()
-        st.success("SQL script executed successfully and queries added to the database.")
-    except (mysql.connector.Error, ValueError) as err:
-        st.error(f"An error occurred while executing the SQL script: {err}")
+        progress["committed"] = progress["statements"]
+
+    try:
+        for statement, bytes_read in statements:
+            progress["bytes_read"] = bytes_read
+            if progress["statements"] < start_at:
+                # Already committed by an earlier run; only restore the session settings
+                if SESSION_STATEMENT.match(statement):
+                    execute_statements(mycursor, [statement])
+                progress["statements"] += 1
+                progress["committed"] = progress["statements"]
+                continue
+
+            if INSERT_STATEMENT.match(statement):
+                batch.append(statement)
+                if len(batch) >= batch_size:
+                    flush()
+            else:
+                flush()
+                execute_statements(mycursor, [statement])
+            progress["statements"] += 1
+            uncommitted += 1
+            if uncommitted >= commit_interval:
+                commit()
+                uncommitted = 0
+            if on_progress:
+                on_progress(progress)
+        commit()
+    finally:
+        mycursor.close()
+    return progress
 
 # Function to perform CRUD operations
 def perform_crud_operations(mycursor, db_connection):
     # Checkbox for creating new database or table
     create_new_db_table = st.sidebar.checkbox("Create New Database or Table")
     if create_new_db_table:
-        create_new_database_or_table(mycursor)
+        create_new_database_or_table(mycursor, db_connection)
 
     # Display Options for CRUD Operations
-    operation = st.sidebar.selectbox("Select an Operation", ("Create", "Read", "Update", "Delete"),
+    operation = st.sidebar.selectbox("Select an Operation",
+                                     ("Create", "Read", "Update", "Delete", "Edit Grid", "Import", "Export"),
                                      placeholder='CRUD Operation', index=None)
     if operation != "Read":
-        selected_database, selected_table = select_database_and_table(mycursor)
+        selected_database, selected_table = select_database_and_table(mycursor, db_connection)
 
     # Perform Selected CRUD Operations
     if operation == "Create" and not create_new_db_table:
         create_record(selected_database, selected_table, mycursor, db_connection)
 
     elif operation == "Read":
-        read_records(mycursor)
+        read_records(mycursor, db_connection)
 
     elif operation == "Update":
         update_record(selected_database, selected_table, mycursor, db_connection)
@@ -186,6 +1151,15 @@ def perform_crud_operations(mycursor, db_connection):
     elif operation == "Delete":
         delete_record(selected_database, selected_table, mycursor, db_connection)
 
+    elif operation == "Edit Grid":
+        edit_grid(selected_database, selected_table, mycursor, db_connection)
+
+    elif operation == "Import":
+        import_records(selected_database, selected_table, mycursor, db_connection)
+
+    elif operation == "Export":
+        export_records(selected_database, selected_table, mycursor, db_connection)
+
 # Function to manage database operations
 def manage_database_operations(mycursor, db_connection):
     selected_database = st.sidebar.selectbox("Select Database", get_all_databases(mycursor), key="manage_database_selectbox",
@@ -206,97 +1180,74 @@ def manage_database_operations(mycursor, db_connection):
 # Function to alter table
 def alter_table(selected_database, mycursor, db_connection):
     st.subheader("Alter Table")
-    mycursor.execute(f"USE {selected_database}")
+    use_database(mycursor, db_connection, selected_database)
     selected_table = st.selectbox("Select Table to Alter", get_all_tables(selected_database, mycursor))
     if selected_table:
         try:
             # Fetching table columns
-            mycursor.execute(f"DESCRIBE {selected_table}")
-            table_columns = [col[0] for col in mycursor.fetchall()]
+            table_columns = get_table_columns(selected_database, selected_table, mycursor)
             selected_column = st.selectbox("Select Column to Alter", table_columns)
             if selected_column:
                 # Fetching data type of selected column
-                mycursor.execute(f"SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = '{selected_table}' AND COLUMN_NAME = '{selected_column}'")
-                selected_column_data_type = mycursor.fetchone()[0]
+                selected_column_data_type = get_column_data_type(selected_database, selected_table, selected_column, mycursor)
 
+                # ALTER statements can run for hours on big tables, so they run as background jobs
+                sql = None
                 alter_option = st.radio("Select Option", ("Rename Column", "Change Column Type", "Add New Column", "Delete Column", "Rename Table"))
                 if alter_option == "Rename Column":
                     new_column_name = st.text_input("Enter New Column Name (e.g., new_column int(100))")
                     if st.button("Rename") and new_column_name:
-                        try:
-                            mycursor.execute(f"ALTER TABLE {selected_table} CHANGE {selected_column} {new_column_name}")
-                            db_connection.commit()
-                            st.success("Column Renamed Successfully!!!")
-                        except mysql.connector.Error as err:
-                            st.error(f"Error: {err}")
+                        sql = f"ALTER TABLE {selected_table} CHANGE {selected_column} {new_column_name}"
                 elif alter_option == "Change Column Type":
                     new_column_type = st.text_input("Enter New Column Type (e.g., int(100) or varchar(255))", placeholder=f"Current: {selected_column_data_type}")
                     if st.button("Change Type") and new_column_type:
-                        try:
-                            mycursor.execute(f"ALTER TABLE {selected_table} MODIFY {selected_column} {new_column_type}")
-                            db_connection.commit()
-                            st.success("Column Type Changed Successfully!!!")
-                        except mysql.connector.Error as err:
-                            st.error(f"Error: {err}")
+                        sql = f"ALTER TABLE {selected_table} MODIFY {selected_column} {new_column_type}"
                 elif alter_option == "Add New Column":
                     new_column_input = st.text_input("Enter New Column Name and Type (e.g., new_column VARCHAR(255))")
                     if st.button("Add Column") and new_column_input:
-                        try:
-                            new_column_data = new_column_input.split()
-                            new_column_name = new_column_data[0]
-                            new_column_type = " ".join(new_column_data[1:])
-                            mycursor.execute(f"ALTER TABLE {selected_table} ADD {new_column_name} {new_column_type}")
-                            db_connection.commit()
-                            st.success("New Column Added Successfully!!!")
-                        except mysql.connector.Error as err:
-                            st.error(f"Error: {err}")
+                        new_column_data = new_column_input.split()
+                        new_column_name = new_column_data[0]
+                        new_column_type = " ".join(new_column_data[1:])
+                        sql = f"ALTER TABLE {selected_table} ADD {new_column_name} {new_column_type}"
                 elif alter_option == "Delete Column":
                     column_to_delete = st.selectbox("Select Column to Delete", table_columns)
                     if st.button("Delete Column"):
-                        try:
-                            mycursor.execute(f"ALTER TABLE {selected_table} DROP COLUMN {column_to_delete}")
-                            db_connection.commit()
-                            st.success("Column Deleted Successfully!!!")
-                        except mysql.connector.Error as err:
-                            st.error(f"Error: {err}")
+                        sql = f"ALTER TABLE {selected_table} DROP COLUMN {column_to_delete}"
                 elif alter_option == "Rename Table":
                     new_table_name = st.text_input("Enter New Table Name")
                     if st.button("Rename Table") and new_table_name:
-                        try:
-                            mycursor.execute(f"ALTER TABLE {selected_table} RENAME TO {new_table_name}")
-                            db_connection.commit()
-                            st.success("Table Renamed Successfully!!!")
-                        except mysql.connector.Error as err:
-                            st.error(f"Error: {err}")
+                        sql = f"ALTER TABLE {selected_table} RENAME TO {new_table_name}"
+                if sql:
+                    submit_statement_job(selected_database, sql)
         except mysql.connector.Error as err:
             st.error(f"Error: {err}")
 
 # Function to truncate a table
 def truncate_table(selected_database, mycursor, db_connection):
     st.subheader("Truncate Table")
-    mycursor.execute(f"USE {selected_database}")
+    use_database(mycursor, db_connection, selected_database)
     selected_table = st.selectbox("Select Table to Truncate", get_all_tables(selected_database, mycursor))
     if selected_table:
         if st.button("Truncate"):
-            try:
-                mycursor.execute(f"TRUNCATE TABLE {selected_table}")
-                db_connection.commit()
-                st.success(f"Table '{selected_table}' truncated successfully!")
-            except mysql.connector.Error as err:
-                st.error(f"Error: {err}")
+            submit_statement_job(selected_database, f"TRUNCATE TABLE {selected_table}")
 
 # Function to drop table
 def drop_table(selected_database, mycursor, db_connection):
     st.subheader("Drop Table")
-    mycursor.execute(f"USE {selected_database}")
+    use_database(mycursor, db_connection, selected_database)
     selected_table = st.selectbox("Select Table to Drop", get_all_tables(selected_database, mycursor))
     if selected_table:
         if st.button("Drop"):
-            try:
-                mycursor.execute(f"DROP TABLE {selected_table}")
-                st.success(f"Table '{selected_table}' dropped successfully!")
-            except mysql.connector.Error as err:
-                st.error(f"Error: {err}")
+            submit_statement_job(selected_database, f"DROP TABLE {selected_table}")
+
+# Function to run a DDL/DML statement as a background job and refresh the catalog when it ends
+def submit_statement_job(selected_database, sql):
+    catalog = get_schema_catalog()
+    result_cache = get_result_cache()
+    job = get_job_runner().submit(sql, statements_job(selected_database, [sql]),
+                                  after=lambda job: (catalog.invalidate(selected_database),
+                                                     result_cache.invalidate(selected_database)))
+    st.info(f"Started job #{job.id}. Follow it under Background Jobs.")
 
 # Function to drop database
 def drop_database(selected_database, mycursor, db_connection):
@@ -304,15 +1255,15 @@ def drop_database(selected_database, mycursor, db_connection):
     if st.button("Drop"):
         try:
             mycursor.execute(f"DROP DATABASE {selected_database}")
+            get_schema_catalog().invalidate(selected_database)
             st.success(f"Database '{selected_database}' dropped successfully!")
         except mysql.connector.Error as err:
             st.error(f"Error: {err}")
 
 # Select Database and Table
-def select_database_and_table(mycursor):
+def select_database_and_table(mycursor, db_connection):
     st.sidebar.subheader("Select Database")
-    mycursor.execute("SHOW DATABASES")
-    databases = [db[0] for db in mycursor.fetchall()]
+    databases = get_all_databases(mycursor)
     if not databases:
         st.sidebar.warning("No databases found.")
         selected_database = None
@@ -321,9 +1272,8 @@ def select_database_and_table(mycursor):
 
     if selected_database:
         # Select Table
-        mycursor.execute(f"USE {selected_database}")
-        mycursor.execute("SHOW TABLES")
-        tables = [table[0] for table in mycursor.fetchall()]
+        use_database(mycursor, db_connection, selected_database)
+        tables = get_all_tables(selected_database, mycursor)
         if not tables:
             st.sidebar.warning("No tables found in the selected database.")
             selected_table = None
@@ -331,19 +1281,101 @@ def select_database_and_table(mycursor):
             selected_table = st.sidebar.selectbox("Table", tables, index=0)
             # Show selected table
             st.sidebar.write(f"Selected Table: {selected_table}")
+            if st.sidebar.checkbox("Show Table Overview"):
+                table_overview(selected_database, selected_table, mycursor)
     else:
         selected_table = None
 
     return selected_database, selected_table
 
+# Function to show size estimates, index cardinality and a sampled preview of a table without scanning it
+def table_overview(selected_database, selected_table, mycursor):
+    with st.expander(f"Overview of {selected_table}", expanded=True):
+        try:
+            # Estimates kept by the storage engine; no COUNT(*)
+            mycursor.execute(
+                "SELECT ENGINE, TABLE_ROWS, AVG_ROW_LENGTH, DATA_LENGTH, INDEX_LENGTH, CREATE_TIME, UPDATE_TIME "
+                "FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                (selected_database, selected_table)
+            )
+            stats = mycursor.fetchone()
+            mycursor.fetchall()
+            if stats is None:
+                st.warning("No statistics found for the table.")
+                return
+            engine, table_rows, avg_row_length, data_length, index_length, create_time, update_time = stats
+            rows_col, data_col, index_col = st.columns(3)
+            rows_col.metric("Estimated Rows", f"{table_rows or 0:,}")
+            data_col.metric("Data Size", f"{(data_length or 0) / 2**20:,.1f} MB")
+            index_col.metric("Index Size", f"{(index_length or 0) / 2**20:,.1f} MB")
+            st.caption(f"Engine: {engine}, average row length: {avg_row_length or 0:,} bytes, "
+                       f"created: {create_time}, last updated: {update_time or 'unknown'}")
+
+            # Per-column cardinality as estimated by the index statistics
+            mycursor.execute(
+                "SELECT INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, CARDINALITY, NON_UNIQUE "
+                "FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s "
+                "ORDER BY INDEX_NAME = 'PRIMARY' DESC, INDEX_NAME, SEQ_IN_INDEX",
+                (selected_database, selected_table)
+            )
+            index_stats = mycursor.fetchall()
+            if index_stats:
+                st.write("Index Cardinality")
+                st.dataframe(pd.DataFrame(index_stats, columns=["Index", "Position", "Column", "Cardinality",
+                                                                "Non Unique"]), hide_index=True)
+
+            sample_size = st.number_input("Sample Size", min_value=1, max_value=1000, value=20, key="overview_sample_size")
+            if st.button("Sample Rows"):
+                columns, rows, sampled = sample_rows(selected_database, selected_table, sample_size, mycursor)
+                if not sampled:
+                    st.caption("The primary key is not numeric, so the preview shows the first rows instead of a random sample.")
+                st.dataframe(pd.DataFrame(rows, columns=columns), hide_index=True)
+        except mysql.connector.Error as err:
+            st.error(f"Error: {err}")
+
+# Function to sample rows by probing random points of a numeric primary key range
+def sample_rows(selected_database, selected_table, sample_size, mycursor):
+    table = qualified_table(selected_database, selected_table)
+    primary_keys = get_primary_keys(selected_database, selected_table, mycursor)
+    data_types = get_schema_catalog().table(selected_database, selected_table, mycursor)["data_types"]
+    if not primary_keys or (data_types.get(primary_keys[0]) or "").lower() not in INTEGER_TYPES:
+        mycursor.execute(f"SELECT * FROM {table} LIMIT %s", (sample_size,))
+        columns = [desc[0] for desc in mycursor.description]
+        return columns, mycursor.fetchall(), False
+
+    # MIN and MAX read the two ends of the primary key index
+    key = quote_identifier(primary_keys[0])
+    key_list = ", ".join(quote_identifier(column) for column in primary_keys)
+    mycursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}")
+    low, high = mycursor.fetchone()
+    mycursor.fetchall()
+    if low is None:
+        mycursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        columns = [desc[0] for desc in mycursor.description]
+        mycursor.fetchall()
+        return columns, [], True
+
+    # One index seek per probe, all sent in a single round trip
+    probes = sorted(random.randint(low, high) for _ in range(sample_size))
+    probe = f"(SELECT * FROM {table} WHERE {key} >= %s ORDER BY {key_list} LIMIT 1)"
+    mycursor.execute(" UNION ALL ".join([probe] * len(probes)), tuple(probes))
+    columns = [desc[0] for desc in mycursor.description]
+    # Probes landing in the same gap return the same row
+    key_indexes = [columns.index(column) for column in primary_keys]
+    rows = {tuple(row[i] for i in key_indexes): row for row in mycursor.fetchall()}
+    return columns, list(rows.values()), True
+
+# Integer data types, whose primary key ranges can be probed
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
 # Function to create a new database or table
-def create_new_database_or_table(mycursor):
+def create_new_database_or_table(mycursor, db_connection):
     st.subheader("Create New Database or Table")
     create_option = st.radio("Select Option", ("Database", "Table"))
     if create_option == "Database":
         create_new_database(mycursor)
     elif create_option == "Table":
-        create_new_table(mycursor)
+        create_new_table(mycursor, db_connection)
 
 # Function to create a new database
 def create_new_database(mycursor):
@@ -352,17 +1384,18 @@ def create_new_database(mycursor):
         try:
             # Create new database
             mycursor.execute(f"CREATE DATABASE {new_db_name}")
+            get_schema_catalog().invalidate(new_db_name)
             st.success(f"Database '{new_db_name}' created successfully!")
         except mysql.connector.Error as err:
             st.error(f"Error: {err}")
 
 # Function to create a new table
-def create_new_table(mycursor):
+def create_new_table(mycursor, db_connection):
     st.subheader("Create New Table")
     selected_database = st.selectbox("Select Database", get_all_databases(mycursor), key="create_table_selectbox",
                                      placeholder='Select Database', index=None)
     if selected_database:
-        mycursor.execute(f"USE {selected_database}")
+        use_database(mycursor, db_connection, selected_database)
         new_table_name = st.text_input("Enter New Table Name:")
         columns_input = st.text_area("Enter Column Names, Types, and Properties (comma-separated):",placeholder='e.g., id int(10) AUTO_INCREMENT PRIMARY KEY, name varchar(255), email varchar(255)')
         if st.button("Create") and new_table_name and columns_input:
@@ -373,6 +1406,7 @@ def create_new_table(mycursor):
                 sql_query = f"CREATE TABLE {new_table_name} ({', '.join(column_defs)})"
                 # Execute the SQL query
                 mycursor.execute(sql_query)
+                get_schema_catalog().invalidate(selected_database)
                 st.success(f"Table '{new_table_name}' created successfully in database '{selected_database}'!")
             except mysql.connector.Error as err:
                 st.error(f"Error: {err}")
@@ -382,35 +1416,562 @@ def create_new_table(mycursor):
 def create_record(selected_database, selected_table, mycursor, db_connection):
     st.subheader("Create a Record")
     st.write(f"Selected Table: {selected_table}")
-    mycursor.execute(f"DESCRIBE {selected_table}")
-    columns = [col[0] for col in mycursor.fetchall()]
+    columns = get_table_columns(selected_database, selected_table, mycursor)
     entry_values = {}
     for col in columns:
-        entry_values[col] = st.text_input(f"Enter {col}")
+        entry_values[col] = st.text_input(f"Enter {col}", help="Leave blank for the column's default")
     if st.button("Create"):
-        column_names = ', '.join(entry_values.keys())
-        column_values = ', '.join(["'{}'".format(value) for value in entry_values.values()])
-        sql = f"INSERT INTO {selected_table}({column_names}) VALUES({column_values})"
-        mycursor.execute(sql)
-        db_connection.commit()
+        values = {col: value for col, value in entry_values.items() if value != ""}
+        if not values:
+            st.warning("Enter at least one value.")
+            return
+        # One prepared INSERT per column set; values are bound, not spliced into the text
+        column_names = ', '.join(quote_identifier(col) for col in values)
+        sql = (f"INSERT INTO {qualified_table(selected_database, selected_table)} ({column_names}) "
+               f"VALUES ({', '.join(['%s'] * len(values))})")
+        try:
+            execute_prepared(db_connection, sql, values.values())
+            db_connection.commit()
+        except mysql.connector.Error as err:
+            st.error(f"Error: {err}")
+            return
+        get_result_cache().invalidate(selected_database, selected_table)
         st.success("Record Created Successfully!!!")
 
+# Function to import records from a CSV or Parquet file
+def import_records(selected_database, selected_table, mycursor, db_connection):
+    st.subheader("Import Records")
+    if not selected_table:
+        return
+    st.write(f"Selected Table: {selected_table}")
+    uploaded_file = st.file_uploader("Upload CSV or Parquet File", type=["csv", "parquet"])
+    if uploaded_file is None:
+        return
+
+    try:
+        file_columns = get_import_file_columns(uploaded_file)
+    except (ValueError, pa.ArrowException) as err:
+        st.error(f"Could not read the file: {err}")
+        return
+
+    # Map every table column to a file column (matching names are preselected)
+    st.write("Map File Columns to Table Columns")
+    mapping = {}
+    for column in get_table_columns(selected_database, selected_table, mycursor):
+        options = ["(skip)"] + file_columns
+        choice = st.selectbox(column, options, index=options.index(column) if column in file_columns else 0,
+                              key=f"import_column_{column}")
+        if choice != "(skip)":
+            mapping[column] = choice
+
+    batch_size = st.number_input("Rows per Batch", min_value=1, max_value=100000, value=IMPORT_BATCH_SIZE)
+    commit_interval = st.number_input("Commit Every N Rows", min_value=1, value=IMPORT_COMMIT_INTERVAL)
+    use_load_data = st.checkbox("Use LOAD DATA LOCAL INFILE", disabled=not ALLOW_LOCAL_INFILE,
+                                help="Enable with MYSQL_ALLOW_LOCAL_INFILE=1; the server must allow local_infile")
+
+    if st.button("Import") and mapping:
+        progress_bar = st.progress(0.0, text="Importing...")
+        started_at = time.monotonic()
+        state = {"rows": 0, "committed": 0}
+
+        def show_progress():
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            progress_bar.progress(get_import_fraction(uploaded_file, state["rows"]),
+                                  text=f"{state['rows']:,} rows ({state['rows'] / elapsed:,.0f} rows/s), "
+                                       f"{state['committed']:,} committed")
+
+        try:
+            import_file(uploaded_file, selected_database, selected_table, mapping, db_connection,
+                        batch_size, commit_interval, use_load_data, state, show_progress)
+            progress_bar.progress(1.0, text=f"{state['rows']:,} rows imported in "
+                                            f"{time.monotonic() - started_at:,.1f}s")
+            st.success("Records Imported Successfully!!!")
+        except (mysql.connector.Error, ValueError, pa.ArrowException) as err:
+            db_connection.rollback()
+            st.error(f"Error after {state['committed']:,} committed rows: {err}")
+        finally:
+            get_result_cache().invalidate(selected_database, selected_table)
+
+# Defaults for file imports: rows per INSERT batch and rows per commit
+IMPORT_BATCH_SIZE = 5000
+IMPORT_COMMIT_INTERVAL = 50000
+
+# Function to read the column names of an uploaded CSV or Parquet file
+def get_import_file_columns(uploaded_file):
+    uploaded_file.seek(0)
+    if uploaded_file.name.lower().endswith(".parquet"):
+        return pq.ParquetFile(uploaded_file).schema_arrow.names
+    return list(pd.read_csv(uploaded_file, nrows=0).columns)
+
+# Function to estimate how much of an uploaded file has been imported
+def get_import_fraction(uploaded_file, rows):
+    if uploaded_file.name.lower().endswith(".parquet"):
+        uploaded_file.seek(0)
+        total_rows = pq.ParquetFile(uploaded_file).metadata.num_rows
+        return min(rows / max(total_rows, 1), 1.0)
+    return min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+
+# Function to stream rows of the mapped file columns in batches
+def iter_import_batches(uploaded_file, file_columns, batch_size):
+    uploaded_file.seek(0)
+    if uploaded_file.name.lower().endswith(".parquet"):
+        for batch in pq.ParquetFile(uploaded_file).iter_batches(batch_size=batch_size, columns=file_columns):
+            yield list(zip(*(batch.column(name).to_pylist() for name in file_columns)))
+    else:
+        # Read as text and let MySQL convert; empty fields become NULL
+        for chunk in pd.read_csv(uploaded_file, usecols=file_columns, dtype=str, keep_default_na=False,
+                                 na_values=[""], chunksize=batch_size):
+            chunk = chunk[file_columns].astype(object)
+            yield list(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+# Function to load an uploaded file into a table with batched inserts
+def import_file(uploaded_file, selected_database, selected_table, mapping, db_connection, batch_size,
+                commit_interval, use_load_data=False, state=None, on_progress=None):
+    state = state if state is not None else {"rows": 0, "committed": 0}
+    table_columns = list(mapping)
+    file_columns = [mapping[column] for column in table_columns]
+    column_list = ", ".join(quote_identifier(column) for column in table_columns)
+    table = qualified_table(selected_database, selected_table)
+    insert_sql = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['%s'] * len(table_columns))})"
+    mycursor = db_connection.cursor()
+    uncommitted = 0
+    try:
+        for rows in iter_import_batches(uploaded_file, file_columns, batch_size):
+            if use_load_data:
+                load_data_local_infile(mycursor, table, column_list, rows)
+            else:
+                # The connector sends an executemany INSERT as one multi-row statement
+                mycursor.executemany(insert_sql, rows)
+            state["rows"] += len(rows)
+            uncommitted += len(rows)
+            if uncommitted >= commit_interval:
+                db_connection.commit()
+                state["committed"] = state["rows"]
+                uncommitted = 0
+            if on_progress:
+                on_progress()
+        db_connection.commit()
+        state["committed"] = state["rows"]
+    finally:
+        mycursor.close()
+    return state
+
+# Function to load a batch of rows through a temporary CSV file and LOAD DATA LOCAL INFILE
+def load_data_local_infile(mycursor, table, column_list, rows):
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", newline="", delete=False) as f:
+        for row in rows:
+            # Unquoted NULL is read as NULL; everything else is enclosed with doubled quotes
+            f.write(",".join("NULL" if value is None else '"' + str(value).replace('"', '""') + '"'
+                             for value in row))
+            f.write("\n")
+    try:
+        mycursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n' ({column_list})",
+            (f.name,)
+        )
+    finally:
+        os.remove(f.name)
+
+# Function to export a table, optionally filtered, to a compressed CSV or Parquet file
+def export_records(selected_database, selected_table, mycursor, db_connection):
+    st.subheader("Export Records")
+    if not selected_table:
+        return
+    st.write(f"Selected Table: {selected_table}")
+    export_format = st.radio("Format", ("CSV", "Parquet"), horizontal=True)
+    # Columns, filters, order and limit come from the query builder, whose values are sent as parameters
+    table_info = get_schema_catalog().table(selected_database, selected_table, mycursor)
+    with st.expander("Query Builder"):
+        query = query_builder(table_info)
+    batch_size = st.number_input("Rows per Batch", min_value=1, max_value=1000000, value=EXPORT_BATCH_SIZE)
+
+    session_state = st.session_state
+    if st.button("Prepare Export"):
+        # Only keep the latest export file of the session on disk
+        remove_export_file(session_state.pop("export_file", None))
+        progress_text = st.empty()
+        started_at = time.monotonic()
+
+        def show_progress(rows, bytes_written):
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            progress_text.write(f"{rows:,} rows exported ({rows / elapsed:,.0f} rows/s, "
+                                f"{bytes_written / 2**20:,.1f} MB compressed)")
+
+        try:
+            path, rows = export_table(db_connection, selected_database, selected_table, export_format,
+                                      query, batch_size, show_progress)
+            extension = ".csv.gz" if export_format == "CSV" else ".parquet"
+            session_state.export_file = {"path": path, "file_name": f"{selected_table}{extension}",
+                                         "mime": "application/gzip" if export_format == "CSV" else
+                                                 "application/vnd.apache.parquet"}
+            st.success(f"Exported {rows:,} rows in {time.monotonic() - started_at:,.1f}s.")
+        except (mysql.connector.Error, pa.ArrowException) as err:
+            st.error(f"Error: {err}")
+
+    export_file = session_state.get("export_file")
+    if export_file and os.path.exists(export_file["path"]):
+        # The file is read when the button is clicked, not on every rerun of the page
+        st.download_button(f"Download {export_file['file_name']}", lambda: read_export_file(export_file["path"]),
+                           file_name=export_file["file_name"], mime=export_file["mime"])
+
+# Rows fetched from the server per batch when exporting
+EXPORT_BATCH_SIZE = 10000
+
+# Function to remove a previously prepared export file
+def remove_export_file(export_file):
+    if export_file and os.path.exists(export_file["path"]):
+        os.remove(export_file["path"])
+
+# Function to read a prepared export file for its download
+def read_export_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+# Function to build the SELECT of an export from the query builder's columns, conditions, order and limit
+def export_query(selected_database, selected_table, query=None):
+    select_list = ", ".join(quote_identifier(column) for column in query["columns"]) if query else "*"
+    sql = f"SELECT {select_list} FROM {qualified_table(selected_database, selected_table)}"
+    params = []
+    if query:
+        where, params = query_condition(query["conditions"])
+        if where:
+            sql += f" WHERE {where}"
+        if query["order"] is not None:
+            sql += f" ORDER BY {quote_identifier(query['order'])}{' DESC' if query['descending'] else ''}"
+        if query["limit"]:
+            sql += " LIMIT %s"
+            params.append(query["limit"])
+    return sql, tuple(params)
+
+# Function to map a MySQL data type to an Arrow type
+def arrow_type(data_type):
+    data_type = (data_type or "").lower()
+    if data_type in ("tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year", "bit"):
+        return pa.int64()
+    if data_type in ("float", "double", "real"):
+        return pa.float64()
+    if data_type == "date":
+        return pa.date32()
+    if data_type in ("datetime", "timestamp"):
+        return pa.timestamp("us")
+    if data_type == "time":
+        # The connector returns TIME values as timedelta
+        return pa.duration("us")
+    if data_type in ("binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob"):
+        return pa.binary()
+    # Decimals are kept as text so no precision is lost
+    return pa.string()
+
+# Function to convert a column of fetched values to an Arrow array
+def to_arrow_array(values, arrow_data_type):
+    if arrow_data_type == pa.string():
+        values = [value if value is None or isinstance(value, str) else
+                  value.decode("utf-8", "replace") if isinstance(value, (bytes, bytearray)) else str(value)
+                  for value in values]
+    elif arrow_data_type == pa.binary():
+        values = [value if value is None else bytes(value) if isinstance(value, (bytes, bytearray)) else
+                  str(value).encode("utf-8") for value in values]
+    return pa.array(values, type=arrow_data_type)
+
+# Function to stream a table through an unbuffered cursor into a compressed file, batch by batch
+def export_table(db_connection, selected_database, selected_table, export_format, query=None,
+                 batch_size=EXPORT_BATCH_SIZE, on_progress=None):
+    sql, params = export_query(selected_database, selected_table, query)
+    catalog_cursor = db_connection.cursor()
+    data_types = get_schema_catalog().table(selected_database, selected_table, catalog_cursor)["data_types"]
+    catalog_cursor.close()
+
+    suffix = ".csv.gz" if export_format == "CSV" else ".parquet"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        path = f.name
+    rows_written = 0
+    cursor = db_connection.cursor(buffered=False)
+    writer = sink = None
+    completed = False
+    try:
+        cursor.execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        schema = pa.schema([(column, arrow_type(data_types.get(column))) for column in columns])
+        if export_format == "CSV":
+            sink = pa.CompressedOutputStream(path, "gzip")
+            writer = pa_csv.CSVWriter(sink, schema)
+        else:
+            writer = pq.ParquetWriter(path, schema, compression="zstd")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            # Only one batch is held in memory at a time
+            arrays = [to_arrow_array(values, field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+            if on_progress:
+                on_progress(rows_written, os.path.getsize(path))
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+        if completed:
+            cursor.close()
+        else:
+            # Rows may still be streaming in; drop the connection rather than read the rest of the table.
+            # The pool reconnects it on its next checkout.
+            db_connection.disconnect()
+            remove_export_file({"path": path})
+    return path, rows_written
+
 # Function to read records
-def read_records(mycursor):
+def read_records(mycursor, db_connection):
     st.subheader("Read Records")
-    selected_database, selected_table = select_database_and_table(mycursor)
+    selected_database, selected_table = select_database_and_table(mycursor, db_connection)
     if selected_table:
         st.write(f"Selected Table: {selected_table}")
         try:
-            mycursor.execute(f"SELECT * FROM {selected_table}")
-            result = mycursor.fetchall()
-            df = pd.DataFrame(result, columns=[i[0] for i in mycursor.description])
-            st.write(df)
-            # Read and discard the unread result
-            mycursor.fetchall()
+            primary_keys = get_primary_keys(selected_database, selected_table, mycursor)
+            if not primary_keys:
+                st.warning("No primary key found in the table. Paging with OFFSET, which slows down on later pages.")
+            table_info = get_schema_catalog().table(selected_database, selected_table, mycursor)
+            with st.expander("Query Builder"):
+                query = query_builder(table_info)
+            page_size = st.number_input("Rows per Page", min_value=1, max_value=10000, value=100, step=50)
+            pager = get_pager(selected_database, selected_table, page_size, query=query)
+
+            fetch_size, last_page = page_window(page_size, query["limit"], len(pager["starts"]))
+            # Key columns are read along with the chosen ones so the next page can be found
+            select_columns = query["columns"] + [column for column in primary_keys + query_order_columns(query)
+                                                 if column not in query["columns"]]
+            select_list = ", ".join(quote_identifier(column) for column in dict.fromkeys(select_columns))
+
+            columns, rows, next_start = fetch_page_cached(db_connection, selected_database, selected_table,
+                                                          primary_keys, pager["starts"][-1], fetch_size,
+                                                          select_list, query, table_info["nullable"])
+            if last_page:
+                next_start = None
+            pager["next_start"] = next_start
+
+            st.dataframe(pd.DataFrame(rows, columns=columns)[query["columns"]])
+
+            page_navigation(pager)
         except mysql.connector.Error as err:
             st.error(f"Error: {err}")
 
+# Function to get the rows to fetch for a page under a LIMIT, and whether the LIMIT ends on that page
+def page_window(page_size, limit, page_number):
+    if not limit:
+        return page_size, False
+    # LIMIT caps the rows over all pages
+    remaining = max(limit - (page_number - 1) * page_size, 0)
+    return min(page_size, remaining), remaining <= page_size
+
+# Operators offered by the query builder, with the number of values each takes
+QUERY_OPERATORS = {"=": 1, "!=": 1, "<": 1, "<=": 1, ">": 1, ">=": 1, "LIKE": 1, "NOT LIKE": 1,
+                   "IN": 1, "BETWEEN": 2, "IS NULL": 0, "IS NOT NULL": 0}
+# Operators that match single values of an index prefix, so the next index column can be used too
+EQUALITY_OPERATORS = {"=", "IN", "IS NULL"}
+# Operators that can never seek an index
+NON_INDEX_OPERATORS = {"!=", "NOT LIKE", "IS NOT NULL"}
+
+# Function to pick columns, conditions, ORDER BY and LIMIT for reading a table
+def query_builder(table_info):
+    all_columns = table_info["columns"]
+    indexed = {columns[0] for columns in table_info["indexes"].values()}
+    # Columns that lead an index are listed first, since filtering on them avoids a table scan
+    filter_columns = sorted(all_columns, key=lambda column: column not in indexed)
+    label = lambda column: f"{column} (indexed)" if column in indexed else column
+
+    columns = st.multiselect("Columns", all_columns, default=all_columns) or all_columns
+
+    conditions = []
+    condition_count = st.number_input("Conditions", min_value=0, max_value=20, value=0, step=1)
+    for i in range(condition_count):
+        column_col, operator_col, value_col = st.columns([2, 1, 2])
+        column = column_col.selectbox("Column", filter_columns, format_func=label, key=f"query_column_{i}")
+        operator = operator_col.selectbox("Operator", list(QUERY_OPERATORS), key=f"query_operator_{i}")
+        values = []
+        if QUERY_OPERATORS[operator] == 2:
+            values = [value_col.text_input("From", key=f"query_from_{i}"),
+                      value_col.text_input("To", key=f"query_to_{i}")]
+        elif operator == "IN":
+            values = [value.strip() for value in
+                      value_col.text_input("Values (comma separated)", key=f"query_value_{i}").split(",")]
+        elif QUERY_OPERATORS[operator]:
+            values = [value_col.text_input("Value", key=f"query_value_{i}")]
+        conditions.append((column, operator, tuple(values)))
+
+    order_col, direction_col, limit_col = st.columns([2, 1, 1])
+    order_column = order_col.selectbox("Order By", [None] + all_columns,
+                                       format_func=lambda column: "Primary key" if column is None else label(column))
+    descending = direction_col.selectbox("Direction", ["ASC", "DESC"]) == "DESC"
+    limit = limit_col.number_input("Limit (0 for all rows)", min_value=0, value=0, step=100)
+
+    query = {"columns": columns, "conditions": conditions, "order": order_column, "descending": descending,
+             "limit": limit}
+    unindexed = unindexed_conditions(table_info, conditions)
+    for column, operator in unindexed:
+        st.warning(f"The filter {quote_identifier(column)} {operator} cannot use an index; it is checked row by row.")
+    if conditions and len(unindexed) == len(conditions):
+        st.warning("No filter can use an index: the whole table is scanned.")
+    if order_column is not None and not any(index[0] == order_column for index in table_info["indexes"].values()):
+        st.warning(f"No index starts with {quote_identifier(order_column)}: rows are sorted after they are read.")
+    return query
+
+# Function to find the conditions that cannot seek an index, as (column, operator) pairs
+def unindexed_conditions(table_info, conditions):
+    seekable = {}
+    for column, operator, values in conditions:
+        # A leading wildcard leaves no prefix to look up in the index
+        if operator in NON_INDEX_OPERATORS or (operator == "LIKE" and values[0][:1] in ("%", "_")):
+            continue
+        seekable.setdefault(column, set()).add(operator)
+    usable = set()
+    for index_columns in table_info["indexes"].values():
+        # Index columns can be used from the left, as long as the columns before match single values
+        for column in index_columns:
+            if column not in seekable:
+                break
+            usable.add(column)
+            if not seekable[column] & EQUALITY_OPERATORS:
+                break
+    return [(column, operator) for column, operator, _ in conditions if column not in usable]
+
+# Function to build the WHERE condition and parameters of the query builder's conditions
+def query_condition(conditions):
+    clauses = []
+    params = []
+    for column, operator, values in conditions:
+        column = quote_identifier(column)
+        if operator == "BETWEEN":
+            clauses.append(f"{column} BETWEEN %s AND %s")
+        elif operator == "IN":
+            clauses.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+        elif QUERY_OPERATORS[operator]:
+            clauses.append(f"{column} {operator} %s")
+        else:
+            clauses.append(f"{column} {operator}")
+        params.extend(values)
+    return " AND ".join(clauses), params
+
+# Function to get the columns a query is ordered by, before the primary key
+def query_order_columns(query):
+    return [query["order"]] if query and query["order"] is not None else []
+
+# Function to fetch a page through the result cache, checked against the table's current version
+def fetch_page_cached(db_connection, selected_database, selected_table, primary_keys, start, page_size,
+                      select_list="*", query=None, nullable=()):
+    result_cache = get_result_cache()
+    version, cacheable = get_table_version(db_connection, selected_database, selected_table)
+    filters = (query["conditions"], query["order"], query["descending"]) if query else ()
+    key = (selected_database, selected_table, select_list, repr(filters), repr(start), page_size)
+    cached = result_cache.get(key, version)
+    if cached is not None:
+        return cached
+    page = fetch_page(db_connection, selected_table, primary_keys, start, page_size, select_list, query, nullable)
+    if cacheable:
+        result_cache.put(key, version, page, estimate_size(page[1]))
+    return page
+
+# Function to get a table's version as (CREATE_TIME, UPDATE_TIME), and whether pages read now may be cached
+def get_table_version(db_connection, selected_database, selected_table):
+    mycursor = db_connection.cursor()
+    try:
+        use_fresh_table_stats(mycursor, db_connection)
+        mycursor.execute("SELECT CREATE_TIME, UPDATE_TIME, NOW() FROM INFORMATION_SCHEMA.TABLES "
+                         "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s", (selected_database, selected_table))
+        row = mycursor.fetchone()
+        mycursor.fetchall()
+    finally:
+        mycursor.close()
+    if row is None:
+        return None, False
+    create_time, update_time, now = row
+    # UPDATE_TIME has one second resolution: a write later in the same second would not change it
+    cacheable = update_time is None or (now - update_time).total_seconds() > 1
+    return (create_time, update_time), cacheable
+
+# Function to estimate the memory held by fetched rows
+def estimate_size(rows):
+    return sum(64 + sum(len(value) if isinstance(value, (str, bytes, bytearray)) else 16 for value in row)
+               for row in rows)
+
+# Function to show Previous/Next buttons for a pager
+def page_navigation(pager, key="read"):
+    # Navigation buttons update the pager before the next rerun fetches the page
+    previous_col, page_col, next_col = st.columns([1, 2, 1])
+    previous_col.button("Previous", disabled=len(pager["starts"]) == 1, key=f"{key}_previous",
+                        on_click=lambda: pager["starts"].pop())
+    page_col.write(f"Page {len(pager['starts'])}")
+    next_col.button("Next", disabled=pager["next_start"] is None, key=f"{key}_next",
+                    on_click=lambda: pager["starts"].append(pager["next_start"]))
+
+# Function to get (or reset) the pagination state of the table being browsed
+def get_pager(selected_database, selected_table, page_size, state_key="read_pager", query=None):
+    session_state = st.session_state
+    pager = session_state.get(state_key)
+    if (pager is None or pager["table"] != (selected_database, selected_table) or pager["page_size"] != page_size
+            or pager.get("query") != query):
+        # 'starts' is a stack of page start positions: a key tuple (or an offset when the
+        # rows cannot be paged by key), None for the first page
+        pager = {"table": (selected_database, selected_table), "page_size": page_size, "query": query,
+                 "starts": [None], "next_start": None}
+        session_state[state_key] = pager
+    return pager
+
+# Function to fetch one page of a table using keyset pagination on the primary key
+# (after the query builder's ORDER BY column, if any)
+def fetch_page(db_connection, selected_table, primary_keys, start, page_size, select_list="*", query=None,
+               nullable=()):
+    where, params = query_condition(query["conditions"]) if query else ("", [])
+    order_columns = query_order_columns(query)
+    direction = " DESC" if query and query["descending"] else ""
+    # NULLs cannot be compared in a row constructor, so a nullable sort column pages by offset
+    keyset = bool(primary_keys) and not set(order_columns) & set(nullable)
+    sort_keys = order_columns + [key for key in primary_keys if key not in order_columns]
+
+    sql = f"SELECT {select_list} FROM {quote_identifier(selected_table)}"
+    conditions = [f"({where})"] if where else []
+    if keyset and start is not None:
+        # Row constructor comparison lets MySQL range-scan the index
+        key_list = ", ".join(quote_identifier(key) for key in sort_keys)
+        conditions.append(f"({key_list}) {'<' if direction else '>'} ({', '.join(['%s'] * len(start))})")
+        params.extend(start)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if sort_keys:
+        sql += " ORDER BY " + ", ".join(quote_identifier(key) + direction for key in sort_keys)
+    if keyset:
+        sql += " LIMIT %s"
+        params.append(page_size + 1)
+    else:
+        sql += " LIMIT %s OFFSET %s"
+        params.extend([page_size + 1, start or 0])
+
+    # Unbuffered cursor: rows are streamed from the server instead of being stored client side
+    cursor = db_connection.cursor(buffered=False)
+    try:
+        cursor.execute(sql, tuple(params))
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchmany(page_size + 1)
+        # Read and discard the unread result
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+    # One extra row tells whether there is a next page
+    next_start = None
+    # An empty page (a LIMIT used up) has no last row to continue from
+    if len(rows) > page_size and page_size > 0:
+        rows = rows[:page_size]
+        if keyset:
+            key_indexes = [columns.index(key) for key in sort_keys]
+            next_start = tuple(rows[-1][i] for i in key_indexes)
+        else:
+            next_start = (start or 0) + page_size
+    return columns, rows[:max(page_size, 0)], next_start
+
 # Function to update a record
 def update_record(selected_database, selected_table, mycursor, db_connection):
     st.subheader("Update a Record")
@@ -418,63 +1979,39 @@ def update_record(selected_database, selected_table, mycursor, db_connection):
         st.write(f"Selected Table: {selected_table}")
         # Get all primary key columns
         try:
-            mycursor.execute(f"SHOW KEYS FROM {selected_table} WHERE Key_name = 'PRIMARY'")
-            primary_keys_info = mycursor.fetchall()
+            primary_keys = get_primary_keys(selected_database, selected_table, mycursor)
 
-            if not primary_keys_info:
+            if not primary_keys:
                 st.error("No primary key found in the table. Cannot perform update.")
                 return
 
-            primary_keys = [primary_key_info[4] for primary_key_info in primary_keys_info]
-
-            # Check if there is only one primary key
-            if len(primary_keys) == 1:
-                primary_key = primary_keys[0]
-                # Get all column names excluding the primary key
-                mycursor.execute(f"DESCRIBE {selected_table}")
-                columns = [col[0] for col in mycursor.fetchall() if col[0] != primary_key]
-                # Show primary key column for reference
-                st.write(f"Primary Key: {primary_key}")
+            # Search the primary key index and fetch only the chosen record
+            key_values, current_record = select_record(selected_database, selected_table, primary_keys, mycursor,
+                                                        db_connection, "update")
+            if current_record is None:
+                return
 
-            else:
-                st.write("Multiple primary keys found in the table.")
-                st.write("Select the primary key to use for update:")
-                # Automatically select the first primary key for update
-                primary_key = primary_keys[0]
-                st.write(f"Primary key '{primary_key}' selected for update.")
-                # Get all column names excluding the selected primary key
-                mycursor.execute(f"DESCRIBE {selected_table}")
-                columns = [col[0] for col in mycursor.fetchall() if col[0] != primary_key]
-                # Show primary key column for reference
-                st.write(f"Primary Key: {primary_key}")
-
-            # Get all primary key values
-            mycursor.execute(f"SELECT {primary_key} FROM {selected_table}")
-            primary_key_values = [row[0] for row in mycursor.fetchall()]
-
-            # Display dropdown list for primary key selection
-            id = st.selectbox(f"Select {primary_key} to Update", primary_key_values)
-
-            # Fetch current values for the selected record
-            mycursor.execute(f"SELECT * FROM {selected_table} WHERE {primary_key} = %s", (id,))
-            current_record = mycursor.fetchone()
-
-            # Input fields for updating values
+            # Input fields for updating values; blank fields keep their current value
             entry_values = {}
-            for col, value in zip(columns, current_record[1:]):  # Skip primary key column
-                entry_values[col] = st.text_input(f"Enter New {col}", placeholder=value)
+            for col, value in current_record.items():
+                if col not in primary_keys:
+                    entry_values[col] = st.text_input(f"Enter New {col}", placeholder=None if value is None else str(value))
 
             # Update button
             if st.button("Update"):
+                changes = {col: value for col, value in entry_values.items() if value != ""}
+                if not changes:
+                    st.warning("Enter at least one new value.")
+                    return
                 # Construct SET clause for SQL query
-                set_clause = ', '.join([f"{col} = '{entry_values[col]}'" for col in entry_values])
-                # Construct WHERE clause for SQL query
-                where_clause = f"{primary_key} = '{id}'"
+                set_clause = ', '.join([f"{quote_identifier(col)} = %s" for col in changes])
                 # Construct UPDATE query
-                sql = f"UPDATE {selected_table} SET {set_clause} WHERE {where_clause}"
-                # Execute UPDATE query
-                mycursor.execute(sql)
+                sql = (f"UPDATE {qualified_table(selected_database, selected_table)} SET {set_clause} "
+                       f"WHERE {key_condition(primary_keys)}")
+                # Execute UPDATE query as a prepared statement
+                execute_prepared(db_connection, sql, tuple(changes.values()) + key_values)
                 db_connection.commit()
+                get_result_cache().invalidate(selected_database, selected_table)
                 st.success("Record Updated Successfully!!!")
 
         except mysql.connector.Error as err:
@@ -487,61 +2024,285 @@ def delete_record(selected_database, selected_table, mycursor, db_connection):
         st.write(f"Selected Table: {selected_table}")
         # Get all primary key columns
         try:
-            mycursor.execute(f"SHOW KEYS FROM {selected_table} WHERE Key_name = 'PRIMARY'")
-            primary_keys_info = mycursor.fetchall()
+            primary_keys = get_primary_keys(selected_database, selected_table, mycursor)
 
-            if not primary_keys_info:
+            if not primary_keys:
                 st.error("No primary key found in the table. Cannot perform deletion.")
                 return
 
-            primary_keys = [primary_key_info[4] for primary_key_info in primary_keys_info]
-
-            # Check if there is only one primary key
-            if len(primary_keys) == 1:
-                primary_key = primary_keys[0]
-                # Show primary key column for reference
-                st.write(f"Primary Key: {primary_key}")
-
-            else:
-                st.write("Multiple primary keys found in the table.")
-                st.write("Select the primary key to use for deletion:")
-                # Automatically select the first primary key for deletion
-                primary_key = primary_keys[0]
-                st.write(f"Primary key '{primary_key}' selected for deletion.")
-                # Show primary key column for reference
-                st.write(f"Primary Key: {primary_key}")
-
-            # Get all primary key values
-            mycursor.execute(f"SELECT {primary_key} FROM {selected_table}")
-            primary_key_values = [row[0] for row in mycursor.fetchall()]
-
-            # Display dropdown list for primary key selection
-            id = st.selectbox(f"Select {primary_key} to Delete", primary_key_values)
+            # Search the primary key index and fetch only the chosen record
+            key_values, current_record = select_record(selected_database, selected_table, primary_keys, mycursor,
+                                                        db_connection, "delete")
+            if current_record is None:
+                return
+            st.dataframe(pd.DataFrame([current_record]), hide_index=True)
 
             # Delete button
             if st.button("Delete"):
-                # Construct WHERE clause for SQL query
-                where_clause = f"{primary_key} = '{id}'"
                 # Construct DELETE query
-                sql = f"DELETE FROM {selected_table} WHERE {where_clause}"
-                # Execute DELETE query
-                mycursor.execute(sql)
+                sql = f"DELETE FROM {qualified_table(selected_database, selected_table)} WHERE {key_condition(primary_keys)}"
+                # Execute DELETE query as a prepared statement
+                execute_prepared(db_connection, sql, key_values)
                 db_connection.commit()
+                get_result_cache().invalidate(selected_database, selected_table)
                 st.success("Record Deleted Successfully!!!")
 
         except mysql.connector.Error as err:
             st.error(f"Error: {err}")
 
+# Function to edit a page of records in a grid and save every change in one transaction
+def edit_grid(selected_database, selected_table, mycursor, db_connection):
+    st.subheader("Edit Records in a Grid")
+    if not selected_table:
+        return
+    st.write(f"Selected Table: {selected_table}")
+    try:
+        primary_keys = get_primary_keys(selected_database, selected_table, mycursor)
+        if not primary_keys:
+            st.error("No primary key found in the table. Cannot edit records in a grid.")
+            return
+        columns = get_table_columns(selected_database, selected_table, mycursor)
+        page_size = st.number_input("Rows per Page", min_value=1, max_value=5000, value=100, step=50,
+                                    key="grid_page_size")
+        pager = get_pager(selected_database, selected_table, page_size, "grid_pager")
+
+        # The page is loaded once and kept as the baseline for the diff and the concurrency checks
+        session_state = st.session_state
+        page_id = (selected_database, selected_table, pager["starts"][-1], page_size)
+        grid = session_state.get("grid_page")
+        if grid is None or grid["page"] != page_id:
+            select_list = f"*, {row_version_expression(columns)} AS `_row_version`"
+            fetched_columns, rows, next_start = fetch_page(db_connection, selected_table, primary_keys,
+                                                           pager["starts"][-1], page_size, select_list)
+            grid = {"page": page_id, "columns": fetched_columns[:-1], "rows": [row[:-1] for row in rows],
+                    "versions": [row[-1] for row in rows], "next_start": next_start,
+                    "editor": f"grid_editor_{time.monotonic_ns()}"}
+            session_state.grid_page = grid
+        pager["next_start"] = grid["next_start"]
+
+        st.data_editor(pd.DataFrame(grid["rows"], columns=grid["columns"]), num_rows="dynamic", key=grid["editor"])
+        page_navigation(pager, "grid")
+
+        # The editor keeps the diff against the baseline: edited cells, added rows and deleted rows
+        changes = session_state.get(grid["editor"], {})
+        counts = (len(changes.get("edited_rows", {})), len(changes.get("added_rows", [])),
+                  len(changes.get("deleted_rows", [])))
+        st.write(f"Pending changes: {counts[0]} updated, {counts[1]} added, {counts[2]} deleted")
+        if st.button("Save Changes", disabled=not any(counts)):
+            conflicts = apply_grid_changes(db_connection, selected_database, selected_table, primary_keys, grid, changes)
+            if conflicts:
+                st.error(f"{conflicts} row(s) were changed or deleted by someone else since the page was loaded. "
+                         "Nothing was saved; reload the page and try again.")
+            else:
+                get_result_cache().invalidate(selected_database, selected_table)
+                st.success("Changes Saved Successfully!!!")
+            # Reload the page on the next rerun
+            session_state.pop("grid_page", None)
+        if st.button("Reload Page"):
+            session_state.pop("grid_page", None)
+            st.rerun()
+    except mysql.connector.Error as err:
+        db_connection.rollback()
+        st.error(f"Error: {err}")
+
+# Function to build a SQL expression fingerprinting the current values of a row
+def row_version_expression(columns):
+    return f"MD5(JSON_ARRAY({', '.join(quote_identifier(column) for column in columns)}))"
+
+# Function to convert an edited grid value to a value the connector can bind
+def to_db_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        # numpy scalar
+        return value.item()
+    return value
+
+# Function to apply grid edits as batched statements in one transaction; returns the number of conflicts
+def apply_grid_changes(db_connection, selected_database, selected_table, primary_keys, grid, changes):
+    table = qualified_table(selected_database, selected_table)
+    key_indexes = [grid["columns"].index(key) for key in primary_keys]
+    # Rows are only changed if their key and version still match the loaded page (optimistic concurrency)
+    key_columns = ", ".join(quote_identifier(key) for key in primary_keys)
+    key_placeholders = f"({', '.join(['%s'] * len(primary_keys))})"
+
+    def original_key(position):
+        return tuple(grid["rows"][position][i] for i in key_indexes)
+
+    def versioned_condition(positions):
+        # Rows are found by key alone, so the server reads them through the primary key; the version is
+        # then checked on those rows. It covers the key columns, so one row cannot match another's version.
+        keys = [value for position in positions for value in original_key(position)]
+        versions = [grid["versions"][position] for position in positions]
+        return (f"({key_columns}) IN ({', '.join([key_placeholders] * len(positions))}) "
+                f"AND {row_version_expression(grid['columns'])} IN ({', '.join(['%s'] * len(positions))})",
+                keys + versions)
+
+    deleted = set(changes.get("deleted_rows", []))
+
+    # Edits that change a primary key are sent on their own, because the batched UPDATE finds rows by key
+    edited_rows, key_edits = {}, {}
+    for position, edited in changes.get("edited_rows", {}).items():
+        position = int(position)
+        if position not in deleted and edited:
+            edits = {column: to_db_value(value) for column, value in edited.items()}
+            (key_edits if set(edits) & set(primary_keys) else edited_rows)[position] = edits
+
+    # Added rows leave blank cells to the column defaults (e.g. AUTO_INCREMENT keys)
+    inserts = {}
+    for added in changes.get("added_rows", []):
+        values = {column: to_db_value(value) for column, value in added.items() if column in grid["columns"]}
+        values = {column: value for column, value in values.items() if value is not None}
+        if values:
+            inserts.setdefault(tuple(values), []).append(tuple(values.values()))
+
+    mycursor = db_connection.cursor()
+    try:
+        # The connection reports matched rows (FOUND_ROWS), so an unchanged row that still matches counts too
+        expected = changed = 0
+        if deleted:
+            # One DELETE matching every deleted row by its key and version
+            condition, params = versioned_condition(sorted(deleted))
+            mycursor.execute(f"DELETE FROM {table} WHERE {condition}", params)
+            expected += len(deleted)
+            changed += mycursor.rowcount
+        if edited_rows:
+            # One UPDATE for every edited row; each edited column picks its new value by the row's key
+            set_clauses, set_params = [], []
+            for column in dict.fromkeys(column for edits in edited_rows.values() for column in edits):
+                cases = [(position, edits[column]) for position, edits in edited_rows.items() if column in edits]
+                when = f"WHEN ({key_columns}) = ({', '.join(['%s'] * len(primary_keys))}) THEN %s"
+                set_clauses.append(f"{quote_identifier(column)} = CASE {' '.join([when] * len(cases))} "
+                                   f"ELSE {quote_identifier(column)} END")
+                set_params += [value for position, new_value in cases
+                               for value in original_key(position) + (new_value,)]
+            condition, params = versioned_condition(list(edited_rows))
+            mycursor.execute(f"UPDATE {table} SET {', '.join(set_clauses)} WHERE {condition}", set_params + params)
+            expected += len(edited_rows)
+            changed += mycursor.rowcount
+        for position, edits in key_edits.items():
+            set_clause = ", ".join(f"{quote_identifier(column)} = %s" for column in edits)
+            condition, params = versioned_condition([position])
+            mycursor.execute(f"UPDATE {table} SET {set_clause} WHERE {condition}", list(edits.values()) + params)
+            expected += 1
+            changed += mycursor.rowcount
+        for insert_columns, params in inserts.items():
+            # The connector sends an executemany INSERT as one multi-row statement
+            column_list = ", ".join(quote_identifier(column) for column in insert_columns)
+            mycursor.executemany(f"INSERT INTO {table} ({column_list}) "
+                                 f"VALUES ({', '.join(['%s'] * len(insert_columns))})", params)
+        if changed != expected:
+            db_connection.rollback()
+            return expected - changed
+        db_connection.commit()
+        return 0
+    finally:
+        mycursor.close()
+
+# Most keys offered by one primary key search
+KEY_SEARCH_LIMIT = 50
+# Data types searched by range (starting value) instead of by text prefix
+RANGE_SEARCH_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "decimal", "numeric",
+                      "float", "double", "real", "year", "date", "datetime", "timestamp", "time"}
+
+# Function to build the WHERE condition matching one primary key value
+def key_condition(primary_keys):
+    return " AND ".join(f"{quote_identifier(key)} = %s" for key in primary_keys)
+
+# Function to pick a record by searching its primary key on the server, then fetch only that record
+def select_record(selected_database, selected_table, primary_keys, mycursor, db_connection, action):
+    st.write(f"Primary Key: {', '.join(primary_keys)}")
+    data_types = get_schema_catalog().table(selected_database, selected_table, mycursor)["data_types"]
+
+    # Exact values for leading key columns narrow the search on composite keys
+    conditions, params = [], []
+    for key in primary_keys[:-1]:
+        value = st.text_input(f"{key} =", key=f"{action}_key_{key}", help="Leave blank to search this column")
+        if value == "":
+            break
+        conditions.append(f"{quote_identifier(key)} = %s")
+        params.append(value)
+
+    # The next key column is searched by prefix (text) or starting value (numbers and dates)
+    search_column = primary_keys[len(conditions)]
+    range_search = (data_types.get(search_column) or "").lower() in RANGE_SEARCH_TYPES
+    search = st.text_input(f"Search {search_column}", key=f"{action}_search_{search_column}",
+                           placeholder="Starting value" if range_search else "Starts with")
+    if search:
+        if range_search:
+            conditions.append(f"{quote_identifier(search_column)} >= %s")
+            params.append(search)
+        else:
+            conditions.append(f"{quote_identifier(search_column)} LIKE %s")
+            params.append(search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+
+    # Both searches walk the primary key index and stop after a handful of keys
+    key_list = ", ".join(quote_identifier(key) for key in primary_keys)
+    sql = f"SELECT {key_list} FROM {qualified_table(selected_database, selected_table)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {key_list} LIMIT %s"
+    mycursor.execute(sql, tuple(params) + (KEY_SEARCH_LIMIT,))
+    key_options = mycursor.fetchall()
+    if not key_options:
+        st.info("No matching records.")
+        return None, None
+
+    key_values = st.selectbox(f"Select Record to {action.capitalize()}", key_options,
+                              format_func=lambda values: ", ".join(f"{key} = {value}" for key, value in zip(primary_keys, values)))
+    if len(key_options) == KEY_SEARCH_LIMIT:
+        st.caption(f"Showing the first {KEY_SEARCH_LIMIT} matches; refine the search to narrow them down.")
+
+    # Fetch current values for the selected record with one prepared point lookup. The columns are
+    # listed so that a changed table gets a new statement instead of stale result metadata.
+    columns = get_table_columns(selected_database, selected_table, mycursor)
+    cursor = execute_prepared(db_connection, f"SELECT {', '.join(quote_identifier(col) for col in columns)} "
+                              f"FROM {qualified_table(selected_database, selected_table)} "
+                              f"WHERE {key_condition(primary_keys)}", key_values)
+    row = cursor.fetchone()
+    cursor.fetchall()
+    if row is None:
+        st.warning("The selected record no longer exists.")
+        return None, None
+    return tuple(key_values), dict(zip(columns, row))
+
+# Function to get the schema catalog shared by the sessions of the logged in user
+def get_schema_catalog():
+    key = (st.session_state.host, st.session_state.username)
+    with _schema_catalogs_lock:
+        if key not in _schema_catalogs:
+            _schema_catalogs[key] = SchemaCatalog()
+        return _schema_catalogs[key]
+
+# Function to get the primary key columns of a table, in key order
+def get_primary_keys(selected_database, selected_table, mycursor):
+    return get_schema_catalog().table(selected_database, selected_table, mycursor)["primary_keys"]
+
+# Function to get the column names of a table, in table order
+def get_table_columns(selected_database, selected_table, mycursor):
+    return get_schema_catalog().table(selected_database, selected_table, mycursor)["columns"]
+
+# Function to get the data type of a column
+def get_column_data_type(selected_database, selected_table, column, mycursor):
+    return get_schema_catalog().table(selected_database, selected_table, mycursor)["data_types"].get(column)
+
+# Function to quote a table or column name for use in SQL
+def quote_identifier(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+# Function to build a database-qualified table name
+def qualified_table(selected_database, selected_table):
+    return f"{quote_identifier(selected_database)}.{quote_identifier(selected_table)}"
+
 # Function to get all databases
 def get_all_databases(mycursor):
-    mycursor.execute("SHOW DATABASES")
-    return [db[0] for db in mycursor.fetchall()]
+    return get_schema_catalog().databases(mycursor)
 
 # Function to get all tables in a database
 def get_all_tables(selected_database, mycursor):
-    mycursor.execute(f"USE {selected_database}")
-    mycursor.execute("SHOW TABLES")
-    return [table[0] for table in mycursor.fetchall()]
+    return get_schema_catalog().tables(selected_database, mycursor)
 
 if __name__ == "__main__":
     main()
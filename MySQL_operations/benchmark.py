@@ -0,0 +1,261 @@
+# Benchmark for MySQL.py: starts a local MySQL or MariaDB server, fills it with synthetic tables
+# and drives the app headless through Streamlit's AppTest.
+#
+#   python benchmark.py --rows 1000 100000 --reruns 20 --output report.json
+#   python benchmark.py --host 127.0.0.1 --port 3306 --user root --password secret
+#
+# The report is JSON: latency percentiles per scenario and table size, statements sent per rerun
+# (from the app's query log) and the peak resident set size of the process.
+import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.constants import ClientFlag
+from streamlit.testing.v1 import AppTest
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+# The helpers shared by the benchmarks live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark_common import LocalServer, add_common_arguments, environment_report, find, peak_rss_mb, summarize, write_report
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MySQL.py")
+BENCH_DATABASE = "mysql_operations_bench"
+# Rows inserted from the client before a table is grown with INSERT ... SELECT on the server
+SEED_ROWS = 1000
+
+# Function to create (or reuse) a synthetic table with the given number of rows
+def create_table(connection, rows):
+    table = f"items_{rows}"
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{BENCH_DATABASE}`")
+    cursor.execute(f"USE `{BENCH_DATABASE}`")
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS `{table}` ("
+        "id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(64) NOT NULL, "
+        "category INT NOT NULL, price DECIMAL(10, 2), created DATETIME NOT NULL, note TEXT, "
+        "KEY category (category))"
+    )
+    cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+    count = cursor.fetchone()[0]
+    if count != rows:
+        cursor.execute(f"TRUNCATE TABLE `{table}`")
+        seed = [("".join(random.choices(string.ascii_lowercase, k=12)), random.randrange(100),
+                 round(random.uniform(1, 1000), 2), f"2024-01-{random.randrange(1, 29):02d} 12:00:00",
+                 "x" * random.randrange(200))
+                for _ in range(min(rows, SEED_ROWS))]
+        cursor.executemany(f"INSERT INTO `{table}` (name, category, price, created, note) "
+                           "VALUES (%s, %s, %s, %s, %s)", seed)
+        connection.commit()
+        count = len(seed)
+        # Double the table on the server until it has the requested size
+        while count < rows:
+            cursor.execute(f"INSERT INTO `{table}` (name, category, price, created, note) "
+                           f"SELECT name, category, price, created, note FROM `{table}` LIMIT %s",
+                           (rows - count,))
+            connection.commit()
+            count += cursor.rowcount
+    cursor.execute(f"ANALYZE TABLE `{table}`")
+    cursor.fetchall()
+    cursor.close()
+    return table
+
+# Function to generate a SQL script of single-row INSERTs into a scratch table
+def generate_script(statements):
+    lines = [f"USE `{BENCH_DATABASE}`;",
+             "CREATE TABLE IF NOT EXISTS script_items (id INT NOT NULL PRIMARY KEY, name VARCHAR(64));",
+             "TRUNCATE TABLE script_items;"]
+    lines.extend(f"INSERT INTO script_items VALUES ({i}, 'name {i}');" for i in range(statements))
+    return "\n".join(lines).encode("utf-8")
+
+# Drives MySQL.py through AppTest as a logged in user
+class AppDriver:
+    def __init__(self, pool, host, user, timeout):
+        self.pool = pool
+        self.host = host
+        self.user = user
+        self.timeout = timeout
+
+    def new_app(self):
+        app = AppTest.from_file(APP, default_timeout=self.timeout)
+        # Skip the login form: the pool connects to the benchmark server's port, which the form cannot
+        app.session_state["authenticated"] = True
+        app.session_state["db_pool"] = self.pool
+        app.session_state["host"] = self.host
+        app.session_state["username"] = self.user
+        app.session_state["password"] = ""
+        self.run(app)
+        return app
+
+    def run(self, app):
+        # Latency of one rerun and the statements it sent, from the app's query log
+        started = time.perf_counter()
+        app.run()
+        latency_ms = (time.perf_counter() - started) * 1000
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        errors = [element.value for element in app.error]
+        if errors:
+            raise RuntimeError(errors[0])
+        query_log = app.session_state["query_log"] if "query_log" in app.session_state else []
+        statements = query_log[-1]["totals"]["statements"] if query_log else 0
+        return latency_ms, statements
+
+    def open_table(self, app, operation, table):
+        find(app.selectbox, "Select an Operation").select(operation)
+        self.run(app)
+        find(app.selectbox, "Database").select(BENCH_DATABASE)
+        self.run(app)
+        find(app.selectbox, "Table").select(table)
+        return self.run(app)
+
+# Scenario: schema lookups for the operation sidebar, with the schema catalog cold and warm
+def bench_metadata(driver, table, rows, reruns):
+    app = driver.new_app()
+    driver.open_table(app, "Update", table)
+    cold, warm = [], []
+    for _ in range(reruns):
+        find(app.sidebar.button, "Refresh Schema").click()
+        cold.append(driver.run(app))
+        warm.append(driver.run(app))
+    return [("metadata_cold", cold), ("metadata_warm", warm)]
+
+# Scenario: paging through a table with Read
+def bench_read(driver, table, rows, reruns):
+    app = driver.new_app()
+    samples = [driver.open_table(app, "Read", table)]
+    for _ in range(reruns):
+        next_button = app.button(key="read_next")
+        if next_button.disabled:
+            break
+        next_button.click()
+        samples.append(driver.run(app))
+    # Filtered read through the query builder on the indexed category column
+    find(app.number_input, "Conditions").set_value(1)
+    driver.run(app)
+    find(app.selectbox, "Column").select("category")
+    find(app.text_input, "Value").input("7")
+    filtered = [driver.run(app)]
+    return [("read_page", samples), ("read_filtered", filtered)]
+
+# Scenario: searching a record by key and updating it
+def bench_update(driver, table, rows, reruns):
+    app = driver.new_app()
+    driver.open_table(app, "Update", table)
+    search, update = [], []
+    for _ in range(reruns):
+        app.text_input(key="update_search_id").input(str(random.randrange(1, rows + 1)))
+        search.append(driver.run(app))
+        find(app.text_input, "Enter New name").input("".join(random.choices(string.ascii_lowercase, k=12)))
+        find(app.button, "Update").click()
+        update.append(driver.run(app))
+    return [("update_search", search), ("update_save", update)]
+
+# Scenario: uploading and executing a script as a background job, timed until the job finishes
+def bench_script(driver, statements, reruns):
+    script = generate_script(statements)
+    samples = []
+    for _ in range(reruns):
+        app = driver.new_app()
+        find(app.sidebar.checkbox, "Upload MySQL Script File").check()
+        driver.run(app)
+        app.file_uploader[0].set_value(("benchmark.sql", script, "application/sql"))
+        driver.run(app)
+        started = time.perf_counter()
+        find(app.button, "Execute Script").click()
+        driver.run(app)
+        job_id = int(app.info[0].value.split("#")[1].split(".")[0])
+        statement_count = 0
+        while True:
+            time.sleep(0.2)
+            _, statement_count = driver.run(app)
+            statuses = [element.value for element in app.markdown if element.value.startswith(f"**#{job_id}** ")]
+            if statuses and not any(word in statuses[0] for word in ("queued", "running")):
+                break
+        if " succeeded " not in statuses[0]:
+            raise RuntimeError(statuses[0])
+        samples.append(((time.perf_counter() - started) * 1000, statement_count))
+    return [("script_execute", samples)]
+
+# Function to summarize latencies (ms) and statements per rerun
+def summarize_reruns(samples):
+    latency = summarize([latency for latency, _ in samples])
+    statements = [count for _, count in samples]
+    return {
+        "samples": latency.pop("samples"),
+        "latency_ms": latency,
+        "round_trips_per_rerun": {"mean": sum(statements) / len(statements), "max": max(statements)},
+    }
+
+# Function to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark MySQL.py against a local MySQL or MariaDB server.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000],
+                        help="table sizes to benchmark (10^3 to 10^8 rows)")
+    parser.add_argument("--reruns", type=int, default=20, help="measured reruns per scenario")
+    parser.add_argument("--script-statements", type=int, default=10000, help="INSERTs in the executed script")
+    parser.add_argument("--script-runs", type=int, default=3, help="measured script executions")
+    parser.add_argument("--scenarios", nargs="+", default=["metadata", "read", "update", "script"],
+                        choices=["metadata", "read", "update", "script"])
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    server = None
+    if args.host is None:
+        server = LocalServer(args.server_binary, args.port,
+                             ["--local-infile=1", "--performance-schema=ON"] + args.server_option,
+                             "mysql_operations_bench_")
+        server.start()
+    host = args.host or "127.0.0.1"
+    try:
+        connection = mysql.connector.connect(host=host, port=args.port, user=args.user, password=args.password)
+        cursor = connection.cursor()
+        cursor.execute("SELECT VERSION()")
+        server_version = cursor.fetchone()[0]
+        cursor.close()
+
+        # Same settings as the app's pools, plus the port
+        pool = pooling.MySQLConnectionPool(pool_name="mysql_operations_bench", pool_size=8, pool_reset_session=False,
+                                           client_flags=[ClientFlag.FOUND_ROWS], host=host, port=args.port,
+                                           user=args.user, password=args.password)
+        driver = AppDriver(pool, host, args.user, args.timeout)
+
+        results = []
+        for rows in args.rows:
+            started = time.perf_counter()
+            table = create_table(connection, rows)
+            print(f"{table}: ready in {time.perf_counter() - started:,.1f}s", file=sys.stderr)
+            scenarios = {"metadata": bench_metadata, "read": bench_read, "update": bench_update}
+            for name in args.scenarios:
+                if name not in scenarios:
+                    continue
+                for scenario, samples in scenarios[name](driver, table, rows, args.reruns):
+                    results.append({"scenario": scenario, "rows": rows, **summarize_reruns(samples),
+                                    "peak_rss_mb": peak_rss_mb()})
+                    print(f"{scenario} ({rows:,} rows): p50 {results[-1]['latency_ms']['p50']:,.1f} ms",
+                          file=sys.stderr)
+        if "script" in args.scenarios:
+            for scenario, samples in bench_script(driver, args.script_statements, args.script_runs):
+                results.append({"scenario": scenario, "rows": args.script_statements, **summarize_reruns(samples),
+                                "peak_rss_mb": peak_rss_mb()})
+        connection.close()
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        **environment_report(server_version),
+        "reruns": args.reruns,
+        # ru_maxrss never decreases, so each result shows the high-water mark reached so far
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    write_report(report, args.output)
+
+if __name__ == "__main__":
+    main()
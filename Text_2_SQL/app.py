@@ -3,105 +3,945 @@ load_dotenv()  # Load all the environment variables
 
 import streamlit as st
 import os
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+import sys
+from contextlib import contextmanager
+import asyncio
+import random
+import io
+import zipfile
+import uuid
+import secrets
+import types
+import collections
+import contextvars
+import weakref
 import pandas as pd
-import atexit
 import mysql.connector
+import mysql.connector.pooling
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from generated_sql import explain_plan_tables, prepare_generated_sql
+from retrieval import BM25Index, table_tokens, tokenize
+# SQL script reading is shared by the apps and lives at the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from sql_scripts import INSERT_STATEMENT, SCHEMA_STATEMENT, execute_statements, iter_sql_statements, name_qualifiers
 
 # Configure Genai Key
 genai.configure(api_key=os.getenv("Google_api_key"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+# Where generated SQL comes from: "gemini", or "fake" for offline benchmarks, which answers with the SQL
+# given for the question in FAKE_LLM_RESPONSES (the path of a JSON file mapping questions to SQL) after
+# FAKE_LLM_LATENCY_MS
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+FAKE_LLM_RESPONSES = os.getenv("FAKE_LLM_RESPONSES")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+# Cached answers are kept apart per backend, so canned SQL never answers a real question
+LLM_CACHE_MODEL = GEMINI_MODEL if LLM_BACKEND == "gemini" else f"{LLM_BACKEND}:{FAKE_LLM_RESPONSES}"
+# Latency spans: most kept in memory for the summary panel, and a JSON lines file every span is appended to
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "10000"))
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
 
-# Establish a connection to MySQL Server
-mydb = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="123",
-    database="information_schema"  # Using information_schema to fetch schema and table names
-)
-mycursor = mydb.cursor()
+# Folder for the files the app writes (caches and logs), kept out of the source tree
+STATE_DIR = os.getenv("TEXT_2_SQL_STATE_DIR",
+                      os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "text_2_sql"))
+# Generated SQL is cached on disk: file, most entries kept, and seconds an entry stays valid
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(STATE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Seconds between checks of INFORMATION_SCHEMA.TABLES for changed tables
+SCHEMA_CHECK_INTERVAL = float(os.getenv("SCHEMA_CHECK_INTERVAL", "30"))
+SYSTEM_SCHEMAS = ("information_schema", "mysql", "performance_schema", "sys")
+# Generated queries: rows fetched per "Fetch More", most rows returned, and milliseconds a query may run
+RESULT_PAGE_ROWS = int(os.getenv("RESULT_PAGE_ROWS", "200"))
+RESULT_MAX_ROWS = int(os.getenv("RESULT_MAX_ROWS", "10000"))
+QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", "30000"))
+# Cost gate, from each generated query's EXPLAIN FORMAT=JSON plan: estimated rows examined above which a
+# query is held back or rejected outright, and table sizes above which a scan of the listed access types
+# is held back
+COST_GATE_CONFIRM_ROWS = float(os.getenv("COST_GATE_CONFIRM_ROWS", "1000000"))
+COST_GATE_REJECT_ROWS = float(os.getenv("COST_GATE_REJECT_ROWS", "100000000"))
+COST_GATE_SCAN_ROWS = float(os.getenv("COST_GATE_SCAN_ROWS", "100000"))
+COST_GATE_SCAN_ACCESS = tuple(access.strip() for access in os.getenv("COST_GATE_SCAN_ACCESS", "ALL,index").split(",")
+                              if access.strip())
+# What happens to a query held back: "confirm" asks the user, "reject" refuses it and "rewrite" runs it
+# for one page of rows under a shorter time limit. Every decision is logged with its plan.
+COST_GATE_ACTION = os.getenv("COST_GATE_ACTION", "confirm").lower()
+COST_GATE_REWRITE_TIMEOUT_MS = int(os.getenv("COST_GATE_REWRITE_TIMEOUT_MS", "5000"))
+# The decisions are kept in a JSON lines file under STATE_DIR, rotated once it reaches COST_GATE_LOG_MAX_BYTES
+# (the previous file is kept with a ".1" suffix; an empty path keeps no file), and the latest COST_GATE_LOG_MAX
+# of them in memory
+COST_GATE_LOG_PATH = os.getenv("COST_GATE_LOG_PATH", os.path.join(STATE_DIR, "cost_gate_log.jsonl"))
+COST_GATE_LOG_MAX_BYTES = int(os.getenv("COST_GATE_LOG_MAX_BYTES", str(10 * 2**20)))
+COST_GATE_LOG_MAX = int(os.getenv("COST_GATE_LOG_MAX", "1000"))
+# Batch mode: Gemini calls and queries in flight at once, and retries of a rate-limited call
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_DB_CONCURRENCY = int(os.getenv("BATCH_DB_CONCURRENCY", "2"))
+BATCH_LLM_RETRIES = int(os.getenv("BATCH_LLM_RETRIES", "5"))
+# Prompt size: tables described (the selected one included) and few-shot examples picked per question
+RETRIEVAL_TOP_K = max(int(os.getenv("RETRIEVAL_TOP_K", "5")), 1)
+FEW_SHOT_K = max(int(os.getenv("FEW_SHOT_K", "3")), 1)
+
+# MySQL Server credentials, from the environment (or .env)
+DB_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "localhost"),
+    "port": int(os.getenv("MYSQL_PORT", "3306")),
+    "user": os.getenv("MYSQL_USER", "root"),
+    "password": os.getenv("MYSQL_PASSWORD", "123"),
+}
+# Connections in the process-wide pool (at most 32), and seconds to wait for a free one
+POOL_SIZE = min(max(int(os.getenv("MYSQL_POOL_SIZE", "8")), 1), 32)
+POOL_WAIT_TIMEOUT = float(os.getenv("MYSQL_POOL_WAIT_TIMEOUT", "10"))
+
+# Function to create the connection pool once per process
+@st.cache_resource
+def get_connection_pool():
+    return mysql.connector.pooling.MySQLConnectionPool(pool_name="text2sql", pool_size=POOL_SIZE, **DB_CONFIG)
+
+# Function to check out a pooled connection for one query, optionally with its schema selected. The pool
+# resets the session when the connection comes back, so a USE never leaks to another query.
+@contextmanager
+def pooled_connection(schema=None):
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+    while True:
+        try:
+            connection = get_connection_pool().get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            # Every connection is in use by other sessions; wait for one to come back
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        if schema:
+            cursor = connection.cursor()
+            cursor.execute(f"USE `{schema.replace('`', '``')}`")
+            cursor.close()
+        yield connection
+    finally:
+        connection.close()
+
+# Timed spans of each stage of answering a question, shared by every session of the process
+class SpanRecorder:
+    def __init__(self, max_spans=TRACE_MAX_SPANS, log_path=TRACE_LOG_PATH, max_log_bytes=0):
+        self._spans = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.log_path = log_path
+        # 0 never rotates the log
+        self.max_log_bytes = max_log_bytes
+        self._log = self._open_log() if log_path else None
+
+    def _open_log(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        return open(self.log_path, "a", encoding="utf-8")
+
+    def record(self, span):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._spans.append(span)
+            if self._log:
+                self._log.write(line + "\n")
+                self._log.flush()
+                if self.max_log_bytes and self._log.tell() >= self.max_log_bytes:
+                    # One previous file is kept next to the log
+                    self._log.close()
+                    os.replace(self.log_path, self.log_path + ".1")
+                    self._log = self._open_log()
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def to_jsonl(self):
+        return "".join(json.dumps(span, default=str) + "\n" for span in self.spans())
+
+    def summary(self):
+        # Latency percentiles and mean sizes per stage, in the order the stages first ran
+        frame = pd.DataFrame(self.spans())
+        if frame.empty:
+            return frame
+        stages = frame.groupby("stage", sort=False)
+        summary = pd.DataFrame({"count": stages["ms"].count(), "p50_ms": stages["ms"].median(),
+                                "p95_ms": stages["ms"].quantile(0.95), "max_ms": stages["ms"].max()})
+        for size in ("prompt_chars", "response_chars", "rows"):
+            if size in frame:
+                summary[f"mean_{size}"] = stages[size].mean()
+        return summary.round(1)
+
+# Function to get the span recorder shared by every session
+@st.cache_resource
+def get_span_recorder():
+    return SpanRecorder()
+
+# The question whose stages are being timed; asyncio tasks and worker threads each see their own
+CURRENT_TRACE = contextvars.ContextVar("current_trace", default=None)
+
+# Function to time the stages run inside it as answering one question
+@contextmanager
+def trace(trace_id):
+    token = CURRENT_TRACE.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        CURRENT_TRACE.reset(token)
+
+# Function to time one stage; sizes and counts added to the yielded span are recorded with it
+@contextmanager
+def span(stage, **attributes):
+    record = {"trace": CURRENT_TRACE.get(), "stage": stage, "started_at": time.time(), **attributes}
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        get_span_recorder().record(record)
+
+# Function to show per-stage latency in the sidebar, with every span as a JSON lines download
+def show_latency_summary():
+    recorder = get_span_recorder()
+    with st.sidebar.expander("Latency"):
+        summary = recorder.summary()
+        if summary.empty:
+            st.caption("No questions answered yet.")
+            return
+        st.dataframe(summary)
+        st.download_button("Download Spans (JSONL)", recorder.to_jsonl(), file_name="spans.jsonl",
+                           mime="application/jsonl")
+
+# Columns, keys and foreign keys of every table, shared by all sessions. Each schema is loaded with one
+# INFORMATION_SCHEMA query; later checks reload only tables whose CREATE_TIME or UPDATE_TIME changed,
+# and re-index only those tables for retrieval.
+class SchemaContextStore:
+    def __init__(self, check_interval=SCHEMA_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._schema_names = None
+        self._schemas = {}
+
+    def schema_names(self, cursor):
+        with self._lock:
+            if self._schema_names is None or time.monotonic() - self._schema_names[0] > self.check_interval:
+                cursor.execute("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME NOT IN (%s, %s, %s, %s) "
+                               "AND SCHEMA_NAME NOT LIKE %s ORDER BY SCHEMA_NAME",
+                               SYSTEM_SCHEMAS + (UPLOAD_SCHEMA_PREFIX.replace("_", "\\_") + "%",))
+                self._schema_names = (time.monotonic(), [row[0] for row in cursor.fetchall()])
+            return self._schema_names[1]
+
+    def table_names(self, schema, cursor):
+        return sorted(self.refresh(schema, cursor))
+
+    def table(self, schema, table):
+        # No round trip: the schema was loaded when its tables were listed
+        with self._lock:
+            entry = self._schemas.get(schema)
+            return entry["tables"].get(table) if entry else None
+
+    def search(self, schema, question, k):
+        # Tables whose names, columns and comments best match the question
+        with self._lock:
+            entry = self._schemas.get(schema)
+            return entry["index"].search(tokenize(question), k) if entry else []
+
+    def fingerprint(self, schema):
+        # Prompts describe several tables of the schema, so cached answers are keyed by all of them
+        with self._lock:
+            entry = self._schemas.get(schema)
+            if not entry:
+                return None
+            if entry["fingerprint"] is None:
+                described = [[name, table["columns"], table["primary_keys"], table["foreign_keys"]]
+                             for name, table in sorted(entry["tables"].items())]
+                entry["fingerprint"] = hashlib.sha256(json.dumps(described, default=str).encode("utf-8")).hexdigest()
+            return entry["fingerprint"]
+
+    def refresh(self, schema, cursor):
+        with self._lock:
+            entry = self._schemas.setdefault(schema, {"checked_at": None, "tables": {}, "index": BM25Index(),
+                                                      "fingerprint": None})
+            if entry["checked_at"] is not None and time.monotonic() - entry["checked_at"] < self.check_interval:
+                return entry["tables"]
+            try:
+                # MySQL 8 caches CREATE_TIME and UPDATE_TIME for a day by default; read them from the engine
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except mysql.connector.Error:
+                # Older MySQL and MariaDB have no such variable and always read them from the engine
+                pass
+            cursor.execute("SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME FROM INFORMATION_SCHEMA.TABLES "
+                           "WHERE TABLE_SCHEMA = %s", (schema,))
+            versions = {name: (create_time, update_time) for name, create_time, update_time in cursor.fetchall()}
+            tables = entry["tables"]
+            for name in set(tables) - set(versions):
+                del tables[name]
+                entry["index"].remove(name)
+                entry["fingerprint"] = None
+            changed = [name for name, version in versions.items() if name not in tables or tables[name]["version"] != version]
+            if changed:
+                # The first load reads the whole schema; later ones only the changed tables
+                loaded = self._load_tables(schema, None if len(changed) == len(versions) else changed, cursor)
+                for name in changed:
+                    tables[name] = loaded.get(name, {"columns": [], "primary_keys": [], "foreign_keys": []})
+                    tables[name]["version"] = versions[name]
+                    entry["index"].add(name, table_tokens(name, tables[name]))
+                entry["fingerprint"] = None
+            entry["checked_at"] = time.monotonic()
+            return tables
+
+    def _load_tables(self, schema, table_names, cursor):
+        sql = ("SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.COLUMN_KEY, c.COLUMN_COMMENT, "
+               "k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME "
+               "FROM INFORMATION_SCHEMA.COLUMNS c "
+               "LEFT JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE k ON k.TABLE_SCHEMA = c.TABLE_SCHEMA "
+               "AND k.TABLE_NAME = c.TABLE_NAME AND k.COLUMN_NAME = c.COLUMN_NAME AND k.REFERENCED_TABLE_NAME IS NOT NULL "
+               "WHERE c.TABLE_SCHEMA = %s")
+        params = [schema]
+        if table_names is not None:
+            sql += f" AND c.TABLE_NAME IN ({', '.join(['%s'] * len(table_names))})"
+            params.extend(table_names)
+        cursor.execute(sql + " ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION", params)
+        tables = {}
+        for table_name, column, column_type, column_key, comment, ref_table, ref_column in cursor.fetchall():
+            table = tables.setdefault(table_name, {"columns": [], "primary_keys": [], "foreign_keys": []})
+            if not table["columns"] or table["columns"][-1]["name"] != column:
+                # A column referencing several tables appears once per reference
+                table["columns"].append({"name": column, "type": column_type, "comment": comment})
+                if column_key == "PRI":
+                    table["primary_keys"].append(column)
+            if ref_table:
+                table["foreign_keys"].append((column, ref_table, ref_column))
+        return tables
+
+# Function to get the schema context store shared by every session
+@st.cache_resource
+def get_schema_context_store():
+    return SchemaContextStore()
 
 # Function to fetch schema names from information_schema
 def get_schema_names():
-    mycursor.execute("SELECT schema_name FROM schemata WHERE schema_name NOT IN ('information_schema', 'mysql', 'performance_schema')")
-    return [row[0] for row in mycursor.fetchall()]
+    with pooled_connection() as connection:
+        return get_schema_context_store().schema_names(connection.cursor())
 
 # Function to fetch table names for a given schema
 def get_table_names(schema):
-    mycursor.execute(f"USE {schema}")
-    mycursor.execute("SHOW TABLES")
-    return [table[0] for table in mycursor.fetchall()]
+    with pooled_connection() as connection:
+        return get_schema_context_store().table_names(schema, connection.cursor())
+
+# Function to load the Google Gemini model once per process
+@st.cache_resource
+def get_gemini_model(model_name):
+    return genai.GenerativeModel(model_name)
+
+# Stand-in for the Gemini model that answers with canned SQL, for measuring the app offline
+class FakeLLM:
+    def __init__(self, responses_path=None, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        self.responses = {}
+        if responses_path:
+            with open(responses_path, encoding="utf-8") as file:
+                self.responses = {normalize_question(question): sql for question, sql in json.load(file).items()}
+
+    def generate_content(self, contents):
+        prompt, question = contents
+        time.sleep(self.latency)
+        sql = self.responses.get(normalize_question(question))
+        if sql is None:
+            # Questions without canned SQL count the rows of the table the prompt is about
+            table = re.search(r"most likely about the table (.+)\.$", prompt, re.MULTILINE)
+            sql = f"SELECT COUNT(*) FROM `{table.group(1)}`" if table else "SELECT 1"
+        return types.SimpleNamespace(text=sql)
+
+# Function to load the fake model once per process
+@st.cache_resource
+def get_fake_llm():
+    return FakeLLM(FAKE_LLM_RESPONSES, FAKE_LLM_LATENCY_MS)
 
 # Function To Load Google Gemini Model and provide queries as response
 def get_gemini_response(question, prompt):
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content([prompt[0], question])
+    model = get_fake_llm() if LLM_BACKEND == "fake" else get_gemini_model(GEMINI_MODEL)
+    with span("llm", backend=LLM_BACKEND, prompt_chars=len(prompt[0]) + len(question)) as record:
+        response = model.generate_content([prompt[0], question])
+        record["response_chars"] = len(response.text)
     return response.text
 
-# Function To retrieve query from the database
-def read_sql_query(sql):
+# SQLite-backed LRU cache of generated SQL, shared by every session of the process
+class LLMCache:
+    def __init__(self, path, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, model TEXT, schema_name TEXT, "
+            "table_name TEXT, fingerprint TEXT, question TEXT, response TEXT, created_at REAL, "
+            "last_used REAL, hits INTEGER DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_table ON llm_cache (model, schema_name, table_name)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model, fingerprint, schema, table, question):
+        return hashlib.sha256(json.dumps([model, fingerprint, schema, table, question]).encode("utf-8")).hexdigest()
+
+    def get(self, model, fingerprint, schema, table, question):
+        key = self.make_key(model, fingerprint, schema, table, question)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response FROM llm_cache WHERE key = ? AND created_at > ?",
+                                   (key, now - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, model, fingerprint, schema, table, question, response):
+        key = self.make_key(model, fingerprint, schema, table, question)
+        now = time.time()
+        with self._lock:
+            # Answers generated for an older version of the table are stale
+            self._db.execute("DELETE FROM llm_cache WHERE model = ? AND schema_name = ? AND table_name = ? "
+                             "AND fingerprint != ?", (model, schema, table, fingerprint))
+            self._db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+            self._db.execute("INSERT OR REPLACE INTO llm_cache (key, model, schema_name, table_name, fingerprint, "
+                             "question, response, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, model, schema, table, fingerprint, question, response, now, now))
+            # Evict the least recently used entries over the limit
+            self._db.execute("DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used DESC "
+                             "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total_hits = self._db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM llm_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "total_hits": total_hits}
+
+# Function to open the LLM cache once per process
+@st.cache_resource
+def get_llm_cache():
+    os.makedirs(os.path.dirname(os.path.abspath(LLM_CACHE_PATH)), exist_ok=True)
+    return LLMCache(LLM_CACHE_PATH)
+
+# Function to normalize a question so trivially different wordings share a cache entry
+def normalize_question(question):
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!; ").lower()
+
+# Function to fingerprint the columns and keys the prompt may describe; answers are cached per fingerprint.
+# The prompt includes other tables of the schema, so any of them changing makes the answer stale.
+def get_schema_fingerprint(schema, table):
+    return get_schema_context_store().fingerprint(schema) or hashlib.sha256(
+        json.dumps([schema, table]).encode("utf-8")).hexdigest()
+
+# Function to get SQL for a question from the cache, asking Gemini only on a miss
+def get_cached_gemini_response(question, prompt, schema, table):
+    cache = get_llm_cache()
+    fingerprint = get_schema_fingerprint(schema, table)
+    normalized = normalize_question(question)
+    with span("llm_cache") as record:
+        response = cache.get(LLM_CACHE_MODEL, fingerprint, schema, table, normalized)
+        record["hit"] = response is not None
+    if response is None:
+        response = get_gemini_response(question, prompt)
+        cache.put(LLM_CACHE_MODEL, fingerprint, schema, table, normalized, response)
+    return response
+
+# Function to show the LLM cache hit rate in the sidebar
+def show_llm_cache_stats():
+    stats = get_llm_cache().stats()
+    lookups = stats["hits"] + stats["misses"]
+    st.sidebar.subheader("LLM Cache")
+    if lookups:
+        st.sidebar.metric("Hit Rate", f"{stats['hits'] / lookups:.0%}", help=f"{stats['hits']} hits, {stats['misses']} misses since start")
+    st.sidebar.caption(f"{stats['entries']:,} cached answers, {stats['total_hits']:,} hits over their lifetime")
+
+# Raised when the plan of a generated query is over the cost limits; carries the gate's decision
+class QueryCostError(ValueError):
+    def __init__(self, decision):
+        super().__init__("The query was not run: its plan needs " + "; ".join(decision["reasons"]) + ".")
+        self.decision = decision
+
+# Function to check a query's plan against the cost limits and log the decision: "run", "confirmed",
+# or COST_GATE_ACTION for a query held back ("reject" above COST_GATE_REJECT_ROWS whatever the action)
+def check_query_cost(cursor, sql, schema, confirmed=False):
+    with span("cost_gate") as record:
+        # EXPLAIN only plans the query; no rows are read
+        cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+        plan = json.loads(cursor.fetchone()[0])
+        tables = explain_plan_tables(plan)
+        examined = sum(table["examined"] for table in tables)
+        reasons = []
+        if examined > COST_GATE_CONFIRM_ROWS:
+            reasons.append(f"about {examined:,.0f} rows examined")
+        for table in tables:
+            if table["access_type"] in COST_GATE_SCAN_ACCESS and table["rows"] > COST_GATE_SCAN_ROWS:
+                scan = "a full scan" if table["access_type"] == "ALL" else f"an {table['access_type']} scan"
+                reasons.append(f"{scan} of {table['table']} (about {table['rows']:,.0f} rows)")
+        if examined > COST_GATE_REJECT_ROWS:
+            action = "reject"
+        elif not reasons:
+            action = "run"
+        elif confirmed:
+            action = "confirmed"
+        else:
+            action = COST_GATE_ACTION
+        record.update(action=action, rows_examined=examined)
+    decision = {"trace": CURRENT_TRACE.get(), "logged_at": time.time(), "schema": schema, "sql": sql,
+                "action": action, "rows_examined": examined, "reasons": reasons, "tables": tables, "plan": plan}
+    get_cost_gate_log().record(decision)
+    return decision
+
+# Function to pass a generated query through the cost gate on the cursor that will run it. Returns the
+# SQL to run (rewritten when the gate says so); raises QueryCostError when it must not run as it is.
+def apply_cost_gate(cursor, sql, bounded_sql, schema, confirmed=False):
+    decision = check_query_cost(cursor, bounded_sql, schema, confirmed)
+    if decision["action"] == "rewrite":
+        set_query_timeout(cursor, COST_GATE_REWRITE_TIMEOUT_MS)
+        return prepare_generated_sql(sql, RESULT_PAGE_ROWS)
+    if decision["action"] not in ("run", "confirmed"):
+        raise QueryCostError(decision)
+    return bounded_sql
+
+# Function to get the log of cost gate decisions: recent ones in memory, and a rotated file at COST_GATE_LOG_PATH
+@st.cache_resource
+def get_cost_gate_log():
+    return SpanRecorder(COST_GATE_LOG_MAX, COST_GATE_LOG_PATH, COST_GATE_LOG_MAX_BYTES)
+
+# Function to run a query held back by the cost gate once the user confirms it
+def run_pending_query(trace_id):
+    pending = st.session_state.pop("pending_query", None)
+    if pending:
+        with trace(trace_id):
+            read_sql_query(pending["sql"], pending["schema"], confirmed=True)
+
+# Function to show how often the cost gate held queries back, with every decision as a JSON lines download
+def show_cost_gate_log():
+    decisions = get_cost_gate_log().spans()
+    with st.sidebar.expander("Cost Gate"):
+        if not decisions:
+            st.caption("No queries checked yet.")
+            return
+        actions = pd.Series([decision["action"] for decision in decisions]).value_counts()
+        st.dataframe(actions.rename("queries"))
+        st.download_button("Download Decisions (JSONL)", get_cost_gate_log().to_jsonl(), file_name="cost_gate_log.jsonl",
+                           mime="application/jsonl")
+
+# Function to run a generated query on a pooled connection and keep its first page of rows in session state.
+# Only a bounded window of rows is read and the connection goes back to the pool right away; "Fetch More"
+# runs the query again for a larger window. The query first passes the cost gate; one held back for
+# confirmation waits in session state.
+def read_sql_query(sql, schema=None, confirmed=False):
+    st.session_state.pop("query_result", None)
+    st.session_state.pop("pending_query", None)
     try:
-        mycursor.execute(sql)
-        columns = [desc[0] for desc in mycursor.description]
-        rows = mycursor.fetchall()
-        return columns, rows
+        with span("execute") as record:
+            bounded_sql = prepare_generated_sql(sql, RESULT_MAX_ROWS)
+            with pooled_connection(schema) as connection:
+                cursor = connection.cursor()
+                set_query_timeout(cursor)
+                checked_sql = apply_cost_gate(cursor, sql, bounded_sql, schema, confirmed)
+                # A query the gate rewrote keeps its single page and shorter time limit
+                rewritten = checked_sql != bounded_sql
+                result = {"sql": checked_sql, "schema": schema, "columns": [], "rows": [], "exhausted": False,
+                          "max_rows": RESULT_PAGE_ROWS if rewritten else RESULT_MAX_ROWS,
+                          "timeout_ms": COST_GATE_REWRITE_TIMEOUT_MS if rewritten else QUERY_TIMEOUT_MS}
+                # Timed up to the first page; later pages are read on "Fetch More"
+                fetch_window(cursor, result, RESULT_PAGE_ROWS)
+                cursor.close()
+            st.session_state.query_result = result
+            record["rows"] = len(result["rows"])
+        return result
+    except QueryCostError as e:
+        if e.decision["action"] == "confirm":
+            st.session_state.pending_query = {"sql": sql, "schema": schema, "reasons": e.decision["reasons"]}
+        else:
+            st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"An error occurred: {e}")
-        return None, None
+        return None
+
+# Function to limit how long the session's queries may run
+def set_query_timeout(cursor, timeout_ms=QUERY_TIMEOUT_MS):
+    try:
+        # Stops runaway queries on the server (MariaDB names the setting in seconds)
+        cursor.execute("SET SESSION max_execution_time = %s", (timeout_ms,))
+    except mysql.connector.Error:
+        cursor.execute("SET SESSION max_statement_time = %s", (timeout_ms / 1000,))
+
+# Function to read the first rows of a query result, up to a window capped at the result's most rows. One row
+# past the window is asked for, to tell whether more rows follow, so the server never has rows left unread.
+def fetch_window(cursor, result, count):
+    window = min(count, result["max_rows"])
+    cursor.execute(prepare_generated_sql(result["sql"], window + 1))
+    rows = cursor.fetchall()
+    result["columns"] = [desc[0] for desc in cursor.description]
+    result["rows"] = rows[:window]
+    result["exhausted"] = len(rows) <= window or window >= result["max_rows"]
+
+# Function to read the next rows of a query result by running it again on a pooled connection
+def fetch_more_rows(result, count=RESULT_PAGE_ROWS):
+    try:
+        with pooled_connection(result["schema"]) as connection:
+            cursor = connection.cursor()
+            set_query_timeout(cursor, result["timeout_ms"])
+            fetch_window(cursor, result, len(result["rows"]) + count)
+            cursor.close()
+    except mysql.connector.Error as e:
+        # e.g. the query ran past its time limit
+        result["error"] = str(e)
+        result["exhausted"] = True
+
+# Function to show the rows of a query read so far, with a button to fetch more
+def show_query_result(result):
+    rows = result["rows"]
+    st.subheader("The Response is:")
+    with span("render", rows=len(rows)):
+        st.dataframe(pd.DataFrame(rows, columns=result["columns"]), hide_index=True)
+    if result.get("error"):
+        st.error(f"An error occurred: {result['error']}")
+    if result["exhausted"]:
+        st.caption(f"{len(rows):,} rows" + (f" (capped at {RESULT_MAX_ROWS:,})" if len(rows) >= RESULT_MAX_ROWS else ""))
+    else:
+        # The callback runs before the rerun, so the new rows show right away
+        st.button(f"Fetch More ({len(rows):,} rows so far)", on_click=fetch_more_rows, args=(result,))
+
+# Function to read the questions of a batch file: one per line, or the "question" (else first) column of a CSV
+def read_batch_questions(uploaded_file):
+    if uploaded_file.name.lower().endswith(".csv"):
+        frame = pd.read_csv(uploaded_file)
+        column = next((name for name in frame.columns if str(name).strip().lower() == "question"), frame.columns[0])
+        questions = frame[column].dropna().astype(str)
+    else:
+        questions = uploaded_file.getvalue().decode("utf-8").splitlines()
+    return [question.strip() for question in questions if question.strip()]
+
+# Function to tell a rate-limit error of the Gemini API
+def is_rate_limited(error):
+    return isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests))
+
+# Function to run one batch question through generation, then execution; generation of other
+# questions continues while this one waits for (or uses) a connection
+async def run_batch_question(index, question, schema, table, limits, cooldown):
+    record = {"index": index, "question": question, "sql": "", "status": "ok", "error": "", "rows": 0,
+              "llm_ms": 0.0, "db_ms": 0.0, "columns": [], "data": []}
+    started = time.perf_counter()
+    # Each question runs in a task of its own, so its spans carry its own trace
+    CURRENT_TRACE.set(uuid.uuid4().hex[:12])
+    try:
+        async with limits["llm"]:
+            for attempt in range(BATCH_LLM_RETRIES + 1):
+                # Every worker waits out a rate limit hit by any of them
+                await asyncio.sleep(max(cooldown["until"] - time.monotonic(), 0))
+                try:
+                    prompt = get_prompt(schema, table, question)
+                    record["sql"] = await asyncio.to_thread(get_cached_gemini_response, question, prompt, schema, table)
+                    break
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == BATCH_LLM_RETRIES:
+                        raise
+                    delay = min(2 ** attempt, 60) * random.uniform(1, 1.5)
+                    cooldown["until"] = max(cooldown["until"], time.monotonic() + delay)
+        record["llm_ms"] = (time.perf_counter() - started) * 1000
+
+        db_started = time.perf_counter()
+        async with limits["db"]:
+            record["columns"], record["data"] = await asyncio.to_thread(run_batch_query, record["sql"], schema)
+        record["db_ms"] = (time.perf_counter() - db_started) * 1000
+        record["rows"] = len(record["data"])
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+    record["total_ms"] = (time.perf_counter() - started) * 1000
+    return record
+
+# Function to run a generated query of a batch on a pooled connection and read its (bounded) rows
+def run_batch_query(sql, schema):
+    with span("execute") as record:
+        bounded_sql = prepare_generated_sql(sql, RESULT_MAX_ROWS)
+        with pooled_connection(schema) as connection:
+            cursor = connection.cursor()
+            set_query_timeout(cursor)
+            # Nobody is there to confirm a batch query, so one held back is not run
+            bounded_sql = apply_cost_gate(cursor, sql, bounded_sql, schema)
+            cursor.execute(bounded_sql)
+            columns = [desc[0] for desc in cursor.description]
+            rows = []
+            while True:
+                chunk = cursor.fetchmany(RESULT_PAGE_ROWS)
+                rows.extend(chunk)
+                if len(chunk) < RESULT_PAGE_ROWS:
+                    break
+            cursor.close()
+        record["rows"] = len(rows)
+        return columns, rows
+
+# Function to run every question of a batch and bundle the results
+async def run_batch(questions, schema, table, progress):
+    limits = {"llm": asyncio.Semaphore(BATCH_LLM_CONCURRENCY), "db": asyncio.Semaphore(BATCH_DB_CONCURRENCY)}
+    cooldown = {"until": 0.0}
+    tasks = [asyncio.create_task(run_batch_question(i, question, schema, table, limits, cooldown))
+             for i, question in enumerate(questions, start=1)]
+    records = []
+    for task in asyncio.as_completed(tasks):
+        records.append(await task)
+        progress.progress(len(records) / len(tasks), text=f"{len(records)} of {len(tasks)} questions answered")
+    return sorted(records, key=lambda record: record["index"])
+
+# Function to bundle batch results as a zip: a summary with timings and one CSV per answered question
+def build_batch_bundle(records):
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, "w", zipfile.ZIP_DEFLATED) as archive:
+        summary = pd.DataFrame([{key: record[key] for key in ("index", "question", "sql", "status", "error", "rows",
+                                                              "llm_ms", "db_ms", "total_ms")}
+                                for record in records])
+        archive.writestr("summary.csv", summary.to_csv(index=False))
+        for record in records:
+            if record["status"] == "ok":
+                archive.writestr(f"results/question_{record['index']:04d}.csv",
+                                 pd.DataFrame(record["data"], columns=record["columns"]).to_csv(index=False))
+    return bundle.getvalue()
 
 # Function to fetch column names for a given table
 def get_column_names(schema, table):
-    mycursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{schema}' AND TABLE_NAME = '{table}'")
-    return [column[0] for column in mycursor.fetchall()]
-
-def get_prompt(schema, table):
-    columns = get_column_names(schema, table)
-    # Assuming the first column is the primary key
-    primary_key = columns[0] if columns else 'id'
-    # Assuming the second column is the name
-    name = columns[1] if len(columns) > 1 else 'name'
-    # Assuming the third column is the class
-    class_column = columns[2] if len(columns) > 2 else 'class'
+    context = get_schema_context_store().table(schema, table)
+    return [column["name"] for column in context["columns"]] if context else []
+
+# Few-shot examples as (question, SQL template); the templates are filled in with the selected table's columns
+FEW_SHOT_EXAMPLES = [
+    ("How many entries of records are present?",
+     "SELECT COUNT(*) FROM {table};"),
+    ("Tell me all the students studying in Data Science class?",
+     "SELECT * FROM {table} where {class_column}='Data Science';"),
+    ("What is the average score of students in each class?",
+     "SELECT {class_column}, AVG(SCORE) FROM {table} GROUP BY {class_column};"),
+    ("What is the highest score in each class?",
+     "SELECT {class_column}, MAX(SCORE) OVER (PARTITION BY {class_column}) FROM {table};"),
+    ("How many students are in each class and section?",
+     "SELECT {class_column}, SECTION, COUNT(*) FROM {table} GROUP BY {class_column}, SECTION HAVING COUNT(*) > 1;"),
+    ("What is the name of the student with the highest score in the 'Data Science' class?",
+     "SELECT {name} FROM {table} WHERE SCORE = (SELECT MAX(SCORE) FROM {table} WHERE {class_column} = 'Data Science');"),
+    ("What is the name of the student with the highest score in each class?",
+     "WITH MAX_SCORES AS (SELECT {class_column}, MAX(SCORE) AS MAX_SCORE FROM {table} GROUP BY {class_column}) "
+     "SELECT t.{name}, t.{class_column} FROM {table} t INNER JOIN MAX_SCORES ms ON t.{class_column} = ms.{class_column} "
+     "AND t.SCORE = ms.MAX_SCORE;"),
+    ("What are the names of the students who are studying in the same class as 'John'?",
+     "SELECT t1.{name} FROM {table} t1 INNER JOIN {table} t2 ON t1.{class_column} = t2.{class_column} WHERE t2.{name} = 'John';"),
+    ("What are the names of the students who are not studying in the same class as 'John'?",
+     "SELECT t1.{name} FROM {table} t1 LEFT JOIN {table} t2 ON t1.{class_column} = t2.{class_column} AND t2.{name} = 'John' "
+     "WHERE t2.{name} IS NULL;"),
+    ("What are the names of the students who are studying either in the same class as 'John' or in the class 'Data Science'?",
+     "SELECT t1.{name} FROM {table} t1 LEFT JOIN {table} t2 ON t1.{class_column} = t2.{class_column} AND t2.{name} = 'John' "
+     "WHERE t2.{name} IS NOT NULL OR t1.{class_column} = 'Data Science';"),
+    ("What are the names of all the students along with the class of 'John' if they are studying in the same class?",
+     "SELECT t1.{name}, t2.{class_column} FROM {table} t1 FULL JOIN {table} t2 ON t1.{class_column} = t2.{class_column} "
+     "AND t2.{name} = 'John';"),
+]
+
+# Function to index the few-shot example questions once per process
+@st.cache_resource
+def get_example_index():
+    index = BM25Index()
+    for i, (question, _) in enumerate(FEW_SHOT_EXAMPLES):
+        index.add(i, tokenize(question))
+    return index
+
+# Function to describe a table's columns, types, keys and foreign keys for the prompt
+def describe_table(schema, table):
+    context = get_schema_context_store().table(schema, table)
+    if not context:
+        return f"Table {table}"
+    lines = [f"Table {table} has the following columns - " + ", ".join(
+        f"{column['name']} {column['type']}" + (f" ({column['comment']})" if column["comment"] else "")
+        for column in context["columns"])]
+    if context["primary_keys"]:
+        lines.append(f"Primary key - {', '.join(context['primary_keys'])}")
+    for column, ref_table, ref_column in context["foreign_keys"]:
+        lines.append(f"Foreign key - {column} references {ref_table}({ref_column})")
+    return "\n    ".join(lines)
+
+# Function to build the prompt from the selected table, the tables most relevant to the question
+# and the most similar examples, so its size stays about the same however large the schema is
+def get_prompt(schema, table, question=""):
+    with span("schema_lookup") as record:
+        columns = get_column_names(schema, table)
+        # Assuming the first column is the primary key
+        primary_key = columns[0] if columns else 'id'
+        # Assuming the second column is the name
+        name = columns[1] if len(columns) > 1 else 'name'
+        # Assuming the third column is the class
+        class_column = columns[2] if len(columns) > 2 else 'class'
+
+        related = get_schema_context_store().search(schema, question, RETRIEVAL_TOP_K)
+        tables = [table] + [other for other in related if other != table][:RETRIEVAL_TOP_K - 1]
+        table_descriptions = "\n    ".join(describe_table(schema, other) for other in tables)
+        record["tables"] = len(tables)
+
+    matches = get_example_index().search(tokenize(question), FEW_SHOT_K)
+    # Questions sharing no words with any example get the simplest ones
+    example_ids = matches or list(range(FEW_SHOT_K))
+    examples = "".join(
+        f"\n    \nExample {n} - {FEW_SHOT_EXAMPLES[i][0]}, \n    the SQL command will be something like this "
+        + FEW_SHOT_EXAMPLES[i][1].format(table=table, name=name, class_column=class_column, primary_key=primary_key)
+        for n, i in enumerate(example_ids, start=1))
 
     prompt = f"""
     You are an expert in converting English questions to SQL query!
-    The MySQL database has the name {schema} and the table {table} has the following columns - {', '.join(columns)} 
-    \n\nFor example,
-    \nExample 1 - How many entries of records are present?, 
-    the SQL command will be something like this SELECT COUNT(*) FROM {table};
-    \nExample 2 - Tell me all the students studying in Data Science class?, 
-    the SQL command will be something like this SELECT * FROM {table} 
-    where {class_column}='Data Science'; 
-    \nExample 3 - What is the average score of students in each class?, 
-    the SQL command will be something like this SELECT {class_column}, AVG(SCORE) FROM {table} GROUP BY {class_column};
-    \nExample 4 - What is the highest score in each class?, 
-    the SQL command will be something like this SELECT {class_column}, MAX(SCORE) OVER (PARTITION BY {class_column}) FROM {table};
-    \nExample 5 - How many students are in each class and section?, 
-    the SQL command will be something like this SELECT {class_column}, SECTION, COUNT(*) FROM {table} GROUP BY {class_column}, SECTION HAVING COUNT(*) > 1;
-    \nExample 6 - What is the name of the student with the highest score in the 'Data Science' class?, 
-    the SQL command will be something like this SELECT {name} FROM {table} WHERE SCORE = (SELECT MAX(SCORE) FROM {table} WHERE {class_column} = 'Data Science');
-    \nExample 7 - What is the name of the student with the highest score in each class?, 
-    the SQL command will be something like this WITH MAX_SCORES AS (SELECT {class_column}, MAX(SCORE) AS MAX_SCORE FROM {table} GROUP BY {class_column}) SELECT t.{name}, t.{class_column} FROM {table} t INNER JOIN MAX_SCORES ms ON t.{class_column} = ms.{class_column} AND t.SCORE = ms.MAX_SCORE;
-    \nExample 8 - What are the names of the students who are studying in the same class as 'John'?, 
-    the SQL command will be something like this SELECT t1.{name} FROM {table} t1 INNER JOIN {table} t2 ON t1.{class_column} = t2.{class_column} WHERE t2.{name} = 'John';
-    \nExample 9 - What are the names of the students who are not studying in the same class as 'John'?, 
-    the SQL command will be something like this SELECT t1.{name} FROM {table} t1 LEFT JOIN {table} t2 ON t1.{class_column} = t2.{class_column} AND t2.{name} = 'John' WHERE t2.{name} IS NULL;
-    \nExample 10 - What are the names of the students who are studying either in the same class as 'John' or in the class 'Data Science'?, 
-    the SQL command will be something like this SELECT t1.{name} FROM {table} t1 LEFT JOIN {table} t2 ON t1.{class_column} = t2.{class_column} AND t2.{name} = 'John' WHERE t2.{name} IS NOT NULL OR t1.{class_column} = 'Data Science';
-    \nExample 11 - What are the names of all the students along with the class of 'John' if they are studying in the same class?, 
-    the SQL command will be something like this SELECT t1.{name}, t2.{class_column} FROM {table} t1 FULL JOIN {table} t2 ON t1.{class_column} = t2.{class_column} AND t2.{name} = 'John';
+    The MySQL database has the name {schema}. The question is most likely about the table {table}.
+    {table_descriptions}
+    \n\nFor example,{examples}
     \nalso the sql code should not have ``` in beginning or end and sql word in output
     """
     return [prompt]
 
-# Function to save uploaded file
-def save_uploaded_file(uploaded_file):
-    with open("student.sql", "wb") as f:  # Assuming the uploaded file is a SQL dump
-        f.write(uploaded_file.getbuffer())
+# Uploaded dumps: per-session schema name prefix, INSERTs per multi-statement round trip, statements per commit
+UPLOAD_SCHEMA_PREFIX = "text2sql_upload_"
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "100"))
+UPLOAD_COMMIT_INTERVAL = int(os.getenv("UPLOAD_COMMIT_INTERVAL", "1000"))
+
+# A SQL dump loaded into a schema of its own. The schema is dropped when the session's state
+# is released (or at exit), which stops a load still in progress.
+class UploadSchema:
+    def __init__(self, file_key):
+        self.file_key = file_key
+        self.name = UPLOAD_SCHEMA_PREFIX + uuid.uuid4().hex[:16]
+        self.progress = {"status": "loading", "bytes_read": 0, "total_bytes": 0, "statements": 0, "error": None}
+        self._stop = threading.Event()
+        self._finalizer = weakref.finalize(self, drop_upload_schema, self.name, self._stop)
+
+    def start(self, uploaded_file):
+        self.progress["total_bytes"] = uploaded_file.size
+        # The thread gets plain objects only, so it does not keep the session's state alive
+        threading.Thread(target=load_sql_dump, args=(uploaded_file, self.name, self.progress, self._stop),
+                         daemon=True, name=f"load_{self.name}").start()
 
-# Delete MySQL database file when Streamlit server is closed
-def delete_db_file():
-    # Add code to delete MySQL database file if necessary
-    pass
+    def drop(self):
+        self._finalizer()
+
+# Function to stream a dump into a schema with batched INSERTs, updating 'progress' as it goes. The dump
+# runs as an account created for the load with privileges on the upload schema only, so the MYSQL_USER
+# account needs CREATE USER and GRANT OPTION; statements naming another schema are refused up front.
+def load_sql_dump(uploaded_file, schema, progress, stop):
+    try:
+        admin = mysql.connector.connect(**DB_CONFIG)
+        try:
+            admin_cursor = admin.cursor()
+            admin_cursor.execute(f"CREATE DATABASE `{schema}`")
+            admin_cursor.execute("SELECT SCHEMA_NAME FROM information_schema.SCHEMATA WHERE SCHEMA_NAME <> %s",
+                                 (schema,))
+            other_schemas = {name.lower() for (name,) in admin_cursor.fetchall()}
+            # The account is for the host this app connects from, as the server sees it
+            admin_cursor.execute("SELECT SUBSTRING_INDEX(USER(), '@', -1)")
+            host = admin_cursor.fetchone()[0]
+            # Random, with the symbol, digit and both cases a password policy may ask for
+            password = secrets.token_urlsafe(24) + "-Aa1"
+            admin_cursor.execute("CREATE USER %s@%s IDENTIFIED BY %s", (schema, host, password))
+            try:
+                # _ is a wildcard in a granted schema name
+                granted = schema.replace("_", "\\_")
+                admin_cursor.execute(f"GRANT ALL PRIVILEGES ON `{granted}`.* TO %s@%s", (schema, host))
+                load_statements(uploaded_file, {**DB_CONFIG, "user": schema, "password": password,
+                                                "database": schema}, other_schemas, progress, stop)
+            finally:
+                admin_cursor.execute("DROP USER %s@%s", (schema, host))
+        finally:
+            admin.close()
+    except Exception as e:
+        progress["error"] = str(e)
+        progress["status"] = "failed"
+
+# Function to run the statements of a dump on a connection of the loading account
+def load_statements(uploaded_file, config, other_schemas, progress, stop):
+    connection = mysql.connector.connect(**config)
+    try:
+        cursor = connection.cursor()
+        batch = []
+        uncommitted = 0
+        for statement, bytes_read in iter_sql_statements(uploaded_file):
+            if stop.is_set():
+                return
+            if SCHEMA_STATEMENT.match(statement):
+                continue
+            # A table's columns (t.c) look the same, so only the names of existing schemas are refused
+            named = [name for name in name_qualifiers(statement) if name.lower() in other_schemas]
+            if named:
+                raise ValueError(f"The dump uses the schema `{named[0]}`; only its own tables can be loaded.")
+            if INSERT_STATEMENT.match(statement):
+                batch.append(statement)
+                if len(batch) >= UPLOAD_BATCH_SIZE:
+                    execute_statements(cursor, batch)
+                    batch.clear()
+            else:
+                if batch:
+                    execute_statements(cursor, batch)
+                    batch.clear()
+                execute_statements(cursor, [statement])
+            uncommitted += 1
+            if uncommitted >= UPLOAD_COMMIT_INTERVAL:
+                connection.commit()
+                uncommitted = 0
+            progress["statements"] += 1
+            progress["bytes_read"] = bytes_read
+        if batch:
+            execute_statements(cursor, batch)
+        connection.commit()
+        progress["status"] = "ready"
+    finally:
+        connection.close()
+
+# Function to drop an upload schema; called once per schema by its finalizer
+def drop_upload_schema(schema, stop):
+    stop.set()
+    try:
+        connection = mysql.connector.connect(**DB_CONFIG)
+        try:
+            connection.cursor().execute(f"DROP DATABASE IF EXISTS `{schema}`")
+        finally:
+            connection.close()
+    except mysql.connector.Error:
+        pass
+
+# Function to get the upload schema of this session, starting a new load for a new file
+def get_upload_schema(uploaded_file):
+    file_key = (uploaded_file.name, uploaded_file.size)
+    upload = st.session_state.get("upload_schema")
+    if upload is None or upload.file_key != file_key:
+        if upload is not None:
+            upload.drop()
+        upload = UploadSchema(file_key)
+        upload.start(uploaded_file)
+        st.session_state.upload_schema = upload
+    return upload
+
+# Function to show the load progress of an upload, refreshing until it finishes
+@st.fragment(run_every=1)
+def show_upload_progress(upload):
+    progress = upload.progress
+    if progress["status"] == "loading":
+        st.progress(min(progress["bytes_read"] / max(progress["total_bytes"], 1), 1.0),
+                    text=f"Loading: {progress['statements']:,} statements, "
+                         f"{progress['bytes_read'] / 2**20:,.1f} of {progress['total_bytes'] / 2**20:,.1f} MB")
+    elif not st.session_state.get("upload_shown") == upload.name:
+        # Rerun the whole page once, so the loaded tables can be selected
+        st.session_state.upload_shown = upload.name
+        st.rerun()
+    elif progress["status"] == "failed":
+        st.error(f"Loading the file failed: {progress['error']}")
+    else:
+        st.success(f"File loaded: {progress['statements']:,} statements.")
 
 # Function to display radio buttons for table selection
 def select_table_radio(table_names):
@@ -113,6 +953,8 @@ st.set_page_config(page_title="Text 2 SQL", page_icon='https://www.icone-png.com
 
 st.header("\U0001F4BB Text to SQL- Retrieve SQL Data")
 
+selected_schema = selected_table = None
+
 # Option selection: select schema or upload file
 option = st.radio("Select Option", ["Select Schema", "Upload File"], index=None)
 
@@ -121,25 +963,15 @@ if option == "Upload File":
     uploaded_file = st.file_uploader("Upload a SQL Dump File", type="sql")
 
     if uploaded_file:
-        save_uploaded_file(uploaded_file)
-        st.success("File uploaded successfully.")
-        script = uploaded_file.getvalue().decode('utf-8')  # Read the uploaded file content
-        lines = script.split('\n')
-
-        # Extract table names
-        table_names = set()
-        for line in lines:
-            line = line.strip()
-            if line.startswith("CREATE TABLE"):
-                table_name = line.split("`")[1]
-                table_names.add(table_name)
-
-        # Display radio buttons for table selection
-        selected_table = st.radio("Select Table", sorted(list(table_names)), index=None)        
-        
-        # Fetch schema name for database connection
-        selected_schema = "information_schema"  # Assuming default schema for now
-        
+        # The dump is loaded in the background into a schema of this session
+        upload = get_upload_schema(uploaded_file)
+        show_upload_progress(upload)
+
+        if upload.progress["status"] == "ready":
+            # Display radio buttons for table selection
+            selected_schema = upload.name
+            selected_table = st.radio("Select Table", get_table_names(selected_schema), index=None)
+
 elif option == "Select Schema":
     # Schema selection dropdown
     schema_names = get_schema_names()
@@ -149,29 +981,54 @@ elif option == "Select Schema":
         table_names = get_table_names(selected_schema)
         selected_table = select_table_radio(table_names)
 
-# Delete MySQL database file when Streamlit server is closed
-atexit.register(delete_db_file)
-
 question = st.text_input("Input: ", key="input")
 submit = st.button("Ask the question")
 
 if submit and selected_table and selected_schema:
-    prompt = get_prompt(selected_schema, selected_table)
-    generated_sql = get_gemini_response(question, prompt)
-    print(f"Generated SQL: {generated_sql}")  # Print the generated SQL query
+    # Every stage of answering is timed under one trace, ending with the render below
+    with trace(uuid.uuid4().hex[:12]) as trace_id, span("question", question_chars=len(question)):
+        prompt = get_prompt(selected_schema, selected_table, question)
+        generated_sql = get_cached_gemini_response(question, prompt, selected_schema, selected_table)
 
-    # Execute the generated SQL query
-    columns, response_rows = read_sql_query(generated_sql)
+        # Execute the generated SQL query
+        read_sql_query(generated_sql, selected_schema)
+    st.session_state.last_question = (question, generated_sql, trace_id)
 
-    # Display the generated SQL query
+# Display the question and generated SQL of the last submit, kept across reruns for "Fetch More"
+if "last_question" in st.session_state:
+    question, generated_sql, trace_id = st.session_state.last_question
     st.subheader("Question:")
     st.write(question)
 
     st.subheader("Generated SQL Query:")
     st.write(generated_sql)
 
-    # Display the Response with column headers in table format
-    if columns is not None and response_rows is not None:
-        st.subheader("The Response is:")
-        st.table(pd.DataFrame(response_rows, columns=columns))
+    # A query the cost gate held back runs only once confirmed
+    if "pending_query" in st.session_state:
+        st.warning("This query looks expensive: its plan needs " + "; ".join(st.session_state.pending_query["reasons"])
+                   + ". Run it anyway?")
+        st.button("Run Anyway", on_click=run_pending_query, args=(trace_id,))
+
+    # Display the Response with column headers, streamed a page at a time
+    if "query_result" in st.session_state:
+        with trace(trace_id):
+            show_query_result(st.session_state.query_result)
+
+# Batch mode: answer a file of questions about the selected table and download one bundle
+with st.expander("Batch Questions"):
+    batch_file = st.file_uploader("Upload Questions (CSV with a question column, or one per line)", type=["csv", "txt"])
+    if st.button("Run Batch", disabled=not (batch_file and selected_table and selected_schema)):
+        questions = read_batch_questions(batch_file)
+        batch_started = time.perf_counter()
+        records = asyncio.run(run_batch(questions, selected_schema, selected_table, st.progress(0.0)))
+        failed = sum(record["status"] != "ok" for record in records)
+        st.session_state.batch_bundle = build_batch_bundle(records)
+        st.success(f"Answered {len(records) - failed} of {len(records)} questions in {time.perf_counter() - batch_started:,.1f}s.")
+    if "batch_bundle" in st.session_state:
+        st.download_button("Download Results", st.session_state.batch_bundle, file_name="batch_results.zip",
+                           mime="application/zip")
 
+# Report how often generated SQL came from the cache, and where the time of answering goes
+show_llm_cache_stats()
+show_latency_summary()
+show_cost_gate_log()
@@ -0,0 +1,234 @@
+# Benchmark for app.py: starts a local MySQL or MariaDB server, fills it with a synthetic schema and
+# drives the app headless through Streamlit's AppTest, with the fake LLM backend answering with canned SQL.
+#
+#   python benchmark.py --rows 1000 100000 --questions 50 --output report.json
+#   python benchmark.py --host 127.0.0.1 --port 3306 --user root --password secret --llm-latency-ms 800
+#
+# The report is JSON: end-to-end latency and throughput per scenario and table size, and latency
+# percentiles per stage (schema lookup, LLM, cost gate, execution, render) from the spans the app records.
+import mysql.connector
+from streamlit.testing.v1 import AppTest
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+# The helpers shared by the benchmarks live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark_common import LocalServer, add_common_arguments, environment_report, find, peak_rss_mb, summarize, write_report
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+BENCH_DATABASE = "text_2_sql_bench"
+# Rows inserted from the client before a table is grown with INSERT ... SELECT on the server
+SEED_ROWS = 1000
+CLASSES = ["Data Science", "Machine Learning", "Databases", "Statistics", "Web Development"]
+# Questions asked, with the SQL the fake LLM answers them with
+QUESTIONS = {
+    "How many students are there?": "SELECT COUNT(*) FROM students",
+    "Tell me all the students studying in Data Science class?":
+        "SELECT * FROM students WHERE class = 'Data Science'",
+    "What is the average score of students in each class?":
+        "SELECT class, AVG(score) FROM students GROUP BY class",
+    "What is the highest score in each section?": "SELECT section, MAX(score) FROM students GROUP BY section",
+    "Which students scored above 90?": "SELECT name, score FROM students WHERE score > 90",
+    "Who teaches each class?":
+        "SELECT c.name, c.teacher FROM classes c",
+    "How many students does each teacher have?":
+        "SELECT c.teacher, COUNT(*) FROM students s JOIN classes c ON c.name = s.class GROUP BY c.teacher",
+    "List the top ten students by score": "SELECT name, class, score FROM students ORDER BY score DESC LIMIT 10",
+}
+
+# Function to create (or reuse) the benchmark schema: students with the given number of rows, the
+# classes they reference, and unrelated tables for the prompt's table retrieval to skip over
+def create_schema(connection, rows, extra_tables):
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{BENCH_DATABASE}`")
+    cursor.execute(f"USE `{BENCH_DATABASE}`")
+    cursor.execute("CREATE TABLE IF NOT EXISTS classes (name VARCHAR(64) NOT NULL PRIMARY KEY, "
+                   "teacher VARCHAR(64) NOT NULL COMMENT 'teacher of the class')")
+    cursor.execute("INSERT IGNORE INTO classes VALUES " + ", ".join(["(%s, %s)"] * len(CLASSES)),
+                   [value for name in CLASSES for value in (name, f"Teacher of {name}")])
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS students ("
+        "id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(64) NOT NULL, "
+        "class VARCHAR(64) NOT NULL, section CHAR(1) NOT NULL, score INT NOT NULL COMMENT 'exam score out of 100', "
+        "KEY class (class), FOREIGN KEY (class) REFERENCES classes (name))"
+    )
+    cursor.execute("SELECT COUNT(*) FROM students")
+    count = cursor.fetchone()[0]
+    if count != rows:
+        cursor.execute("DELETE FROM students")
+        seed = [("".join(random.choices(string.ascii_lowercase, k=10)), random.choice(CLASSES),
+                 random.choice("ABC"), random.randrange(101))
+                for _ in range(min(rows, SEED_ROWS))]
+        cursor.executemany("INSERT INTO students (name, class, section, score) VALUES (%s, %s, %s, %s)", seed)
+        connection.commit()
+        count = len(seed)
+        # Double the table on the server until it has the requested size
+        while count < rows:
+            cursor.execute("INSERT INTO students (name, class, section, score) "
+                           "SELECT name, class, section, score FROM students LIMIT %s", (rows - count,))
+            connection.commit()
+            count += cursor.rowcount
+    for i in range(extra_tables):
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS `inventory_{i:04d}` (id INT NOT NULL PRIMARY KEY, "
+                       f"sku_{i} VARCHAR(32) COMMENT 'warehouse item code', quantity_{i} INT, location_{i} VARCHAR(64))")
+    cursor.execute("ANALYZE TABLE students, classes")
+    cursor.fetchall()
+    cursor.close()
+
+# Drives app.py through AppTest with a schema and table selected
+class AppDriver:
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def new_app(self, table="students"):
+        app = AppTest.from_file(APP, default_timeout=self.timeout)
+        self.run(app)
+        find(app.radio, "Select Option").set_value("Select Schema")
+        self.run(app)
+        find(app.selectbox, "Select Schema").select(BENCH_DATABASE)
+        self.run(app)
+        find(app.selectbox, "Select Table").select(table)
+        self.run(app)
+        return app
+
+    def run(self, app):
+        started = time.perf_counter()
+        app.run()
+        latency_ms = (time.perf_counter() - started) * 1000
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        errors = [element.value for element in app.error]
+        if errors:
+            raise RuntimeError(errors[0])
+        return latency_ms
+
+# Scenario: asking questions one after another, each timed from the click to the rendered result
+def bench_ask(driver, questions):
+    app = driver.new_app()
+    samples = []
+    started = time.perf_counter()
+    for question in questions:
+        app.text_input(key="input").input(question)
+        find(app.button, "Ask the question").click()
+        samples.append(driver.run(app))
+    return samples, len(questions) / (time.perf_counter() - started)
+
+# Scenario: answering the questions as one batch file
+def bench_batch(driver, questions):
+    app = driver.new_app()
+    app.file_uploader[0].set_value(("questions.txt", "\n".join(questions).encode("utf-8"), "text/plain"))
+    driver.run(app)
+    find(app.button, "Run Batch").click()
+    latency_ms = driver.run(app)
+    return [latency_ms], len(questions) / (latency_ms / 1000)
+
+# Function to read the spans the app appended to its trace log since the given offset
+def read_spans(path, offset):
+    with open(path, encoding="utf-8") as file:
+        file.seek(offset)
+        spans = [json.loads(line) for line in file if line.strip()]
+        return spans, file.tell()
+
+# Function to summarize spans per stage: latency, and mean prompt, response and result sizes
+def summarize_stages(spans):
+    stages = {}
+    for span in spans:
+        stages.setdefault(span["stage"], []).append(span)
+    summary = {}
+    for stage, stage_spans in stages.items():
+        summary[stage] = {"latency_ms": summarize([span["ms"] for span in stage_spans]),
+                          "errors": sum("error" in span for span in stage_spans)}
+        for size in ("prompt_chars", "response_chars", "rows"):
+            values = [span[size] for span in stage_spans if size in span]
+            if values:
+                summary[stage][f"mean_{size}"] = sum(values) / len(values)
+    return summary
+
+# Function to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark app.py offline against a local MySQL or MariaDB server.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000], help="student rows to benchmark")
+    parser.add_argument("--tables", type=int, default=200, help="unrelated tables in the schema")
+    parser.add_argument("--questions", type=int, default=40, help="questions asked per scenario")
+    parser.add_argument("--scenarios", nargs="+", default=["ask", "batch"], choices=["ask", "batch"])
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated latency of each LLM call")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="keep the app's LLM cache on (repeated questions then skip the LLM)")
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    server = None
+    if args.host is None:
+        server = LocalServer(args.server_binary, args.port, args.server_option, "text_2_sql_bench_")
+        server.start()
+    host = args.host or "127.0.0.1"
+    workdir = tempfile.mkdtemp(prefix="text_2_sql_bench_run_")
+    responses_path = os.path.join(workdir, "responses.json")
+    trace_path = os.path.join(workdir, "spans.jsonl")
+    with open(responses_path, "w", encoding="utf-8") as file:
+        json.dump(QUESTIONS, file)
+    open(trace_path, "w").close()
+    # The app reads its settings from the environment on every run
+    os.environ.update({
+        "MYSQL_HOST": host, "MYSQL_PORT": str(args.port), "MYSQL_USER": args.user, "MYSQL_PASSWORD": args.password,
+        "LLM_BACKEND": "fake", "FAKE_LLM_RESPONSES": responses_path, "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"), "TRACE_LOG_PATH": trace_path,
+        # Every query runs, so the cost gate adds only its EXPLAIN to the timings
+        "COST_GATE_CONFIRM_ROWS": "inf", "COST_GATE_REJECT_ROWS": "inf", "COST_GATE_SCAN_ROWS": "inf",
+        "COST_GATE_LOG_PATH": os.path.join(workdir, "cost_gate_log.jsonl"),
+    })
+    if not args.llm_cache:
+        os.environ["LLM_CACHE_MAX_ENTRIES"] = "0"
+    questions = [list(QUESTIONS)[i % len(QUESTIONS)] for i in range(args.questions)]
+    offset = 0
+    try:
+        connection = mysql.connector.connect(host=host, port=args.port, user=args.user, password=args.password)
+        cursor = connection.cursor()
+        cursor.execute("SELECT VERSION()")
+        server_version = cursor.fetchone()[0]
+        cursor.close()
+        driver = AppDriver(args.timeout)
+
+        results = []
+        for rows in args.rows:
+            started = time.perf_counter()
+            create_schema(connection, rows, args.tables)
+            print(f"{BENCH_DATABASE} ({rows:,} students): ready in {time.perf_counter() - started:,.1f}s",
+                  file=sys.stderr)
+            scenarios = {"ask": bench_ask, "batch": bench_batch}
+            for name in args.scenarios:
+                samples, throughput = scenarios[name](driver, questions)
+                spans, offset = read_spans(trace_path, offset)
+                results.append({"scenario": name, "rows": rows, "questions": len(questions),
+                                "latency_ms": summarize(samples), "questions_per_second": throughput,
+                                "stages": summarize_stages(spans), "peak_rss_mb": peak_rss_mb()})
+                print(f"{name} ({rows:,} rows): {throughput:,.1f} questions/s", file=sys.stderr)
+        connection.close()
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        **environment_report(server_version),
+        "schema_tables": args.tables + 2,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_cache": args.llm_cache,
+        # ru_maxrss never decreases, so each result shows the high-water mark reached so far
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    write_report(report, args.output)
+
+if __name__ == "__main__":
+    main()
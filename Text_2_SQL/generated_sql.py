@@ -0,0 +1,100 @@
+# Checks of the SQL generated for a question, before it reaches the server
+import re
+
+# Quoted strings, quoted names and comments, which are skipped when the generated SQL is inspected. The
+# server runs the body of a /*! ... */ (or MariaDB /*M! ... */) comment, so those are inspected as code,
+# and -- only starts a comment when followed by whitespace (1--1 is a subtraction).
+SQL_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`|--(?=\s|$)[^\n]*|#[^\n]*"
+                         r"|/\*(?!M?!).*?\*/", re.DOTALL)
+SQL_COMMENT = re.compile(r"--|#|/\*")
+# A LIMIT clause at the end of the statement: LIMIT n, LIMIT offset, n or LIMIT n OFFSET m
+TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*(?:,\s*(\d+)|\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+# Clauses a generated query may not use: INTO writes files or variables, and locking reads hold row locks
+FORBIDDEN_CLAUSE = re.compile(r"\bINTO\b|\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.IGNORECASE)
+
+# Function to check generated SQL and bound the rows it can return; raises ValueError for unsafe SQL
+def prepare_generated_sql(sql, max_rows):
+    sql = re.sub(r"^\s*```(?:sql)?|```\s*$", "", sql.strip(), flags=re.IGNORECASE).strip()
+    # Drop comments, since a trailing -- or # comment would swallow an appended LIMIT
+    sql = SQL_LITERAL.sub(lambda match: " " if SQL_COMMENT.match(match.group()) else match.group(), sql)
+    sql = sql.strip().rstrip(";").strip()
+    # Blank out literals (keeping positions) so keywords inside them are ignored
+    masked = SQL_LITERAL.sub(lambda match: " " * len(match.group()), sql)
+    if ";" in masked:
+        raise ValueError("The generated SQL has more than one statement.")
+    # Every other comment is gone, so what is left of /* opens a comment running to the end
+    if "/*" in re.sub(r"/\*M?!.*?\*/", "", masked, flags=re.DOTALL):
+        raise ValueError("The generated SQL has an unterminated comment.")
+    if not re.match(r"\s*(?:SELECT|\()", main_statement(masked), re.IGNORECASE):
+        raise ValueError("Only SELECT queries are run.")
+    forbidden = FORBIDDEN_CLAUSE.search(masked)
+    if forbidden:
+        raise ValueError(f"The generated SQL uses {' '.join(forbidden.group().upper().split())}, which is not allowed.")
+    limit = TRAILING_LIMIT.search(masked)
+    if limit is None:
+        return f"{sql} LIMIT {max_rows}"
+    # The row count is the second number of LIMIT offset, n
+    count = 2 if limit.group(2) else 1
+    if int(limit.group(count)) > max_rows:
+        sql = sql[:limit.start(count)] + str(max_rows) + sql[limit.end(count):]
+    return sql
+
+# Function to skip the common table expressions of a WITH statement: name [(columns)] AS (query), ... and
+# return the statement they are defined for, which may also be an UPDATE or DELETE
+def main_statement(masked):
+    start = re.match(r"\s*WITH\s+(?:RECURSIVE\s+)?", masked, re.IGNORECASE)
+    if start is None:
+        return masked
+    depth = 0
+    for position in range(start.end(), len(masked)):
+        if masked[position] == "(":
+            depth += 1
+        elif masked[position] == ")":
+            depth -= 1
+            rest = masked[position + 1:]
+            # A column list is followed by AS and a query by a comma or the main statement
+            if depth == 0 and not re.match(r"\s*(?:,|AS\b)", rest, re.IGNORECASE):
+                return rest
+    return ""
+
+# Function to list the tables a plan reads, with the rows examined per scan and in total. Tables of a
+# nested loop are scanned once per row produced by the tables before them; MySQL reports that running
+# product as rows_produced_per_join, MariaDB as rows and filtered per table.
+def explain_plan_tables(plan):
+    tables = []
+
+    def visit(node):
+        if isinstance(node, list):
+            for item in node:
+                visit(item)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key == "nested_loop":
+                    join(value)
+                elif key == "table" and isinstance(value, dict):
+                    join([node])
+                else:
+                    visit(value)
+
+    def join(items):
+        produced = 1.0
+        for item in items:
+            table = item.get("table") or item.get("block-nl-join", {}).get("table")
+            if not isinstance(table, dict):
+                visit(item)
+                continue
+            if "table_name" not in table:
+                # e.g. MariaDB's {"message": "Impossible WHERE"}: no table is read
+                continue
+            per_scan = float(table.get("rows_examined_per_scan", table.get("rows", 1)) or 0)
+            tables.append({"table": table.get("table_name"), "access_type": table.get("access_type"),
+                           "rows": per_scan, "examined": produced * per_scan})
+            if "rows_produced_per_join" in table:
+                produced = float(table["rows_produced_per_join"])
+            else:
+                produced *= per_scan * float(table.get("filtered", 100)) / 100
+            # Subqueries attached to the table are planned separately
+            visit({key: value for key, value in table.items() if key != "table"})
+
+    visit(plan)
+    return tables
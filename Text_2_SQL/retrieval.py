@@ -0,0 +1,67 @@
+# Retrieval of the tables and examples relevant to a question, ranked with BM25
+import math
+import re
+
+# Function to split text into lowercase search terms; camelCase and snake_case names split into words
+# and a trailing plural "s" is dropped, so "StudentScores" matches "student score"
+def tokenize(text):
+    words = re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", text or "")
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+            for word in (word.lower() for word in words)]
+
+# Function to list a table's search terms: its name (counted twice), columns, comments and referenced tables
+def table_tokens(name, context):
+    tokens = tokenize(name) * 2
+    for column in context["columns"]:
+        tokens += tokenize(column["name"]) + tokenize(column["comment"])
+    for _, ref_table, _ in context["foreign_keys"]:
+        tokens += tokenize(ref_table)
+    return tokens
+
+# BM25 inverted index. Documents are added and removed one at a time, so a changed table only
+# updates its own postings; a search touches only the postings of the question's terms.
+class BM25Index:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, doc, tokens):
+        self.remove(doc)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[doc] = count
+        self._lengths[doc] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, doc):
+        length = self._lengths.pop(doc, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for token in [token for token, postings in self._postings.items() if doc in postings]:
+            del self._postings[token][doc]
+            if not self._postings[token]:
+                del self._postings[token]
+
+    def search(self, tokens, k):
+        if not self._lengths:
+            return []
+        average_length = self._total_length / len(self._lengths) or 1
+        scores = {}
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self._lengths) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, count in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0) + idf * count * (self.k1 + 1) / (count + norm)
+        return [doc for doc, _ in sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))[:k]]
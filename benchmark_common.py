@@ -0,0 +1,126 @@
+# Helpers shared by the apps' benchmarks: a throwaway local server, widget lookup in AppTest,
+# latency summaries and the command line options and report fields every benchmark has.
+import mysql.connector
+import streamlit as st
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Seconds to wait for a started server to accept connections
+SERVER_START_TIMEOUT = 120
+
+# A throwaway MySQL or MariaDB server with its own data directory
+class LocalServer:
+    def __init__(self, binary=None, port=3307, options=(), prefix="bench_"):
+        self.binary = binary or shutil.which("mariadbd") or shutil.which("mysqld")
+        if not self.binary:
+            sys.exit("No mariadbd or mysqld found; install one or pass --server-binary or --host.")
+        self.port = port
+        self.options = list(options)
+        self.prefix = prefix
+        self.datadir = None
+        self.process = None
+
+    def start(self):
+        self.datadir = tempfile.mkdtemp(prefix=self.prefix)
+        version = subprocess.run([self.binary, "--version"], capture_output=True, text=True).stdout
+        # The server refuses to run as root unless asked to
+        user = ["--user=root"] if os.geteuid() == 0 else []
+        if "MariaDB" in version:
+            install_db = shutil.which("mariadb-install-db") or shutil.which("mysql_install_db")
+            subprocess.run([install_db, "--no-defaults", f"--datadir={self.datadir}", "--skip-test-db",
+                            "--auth-root-authentication-method=normal"] + user,
+                           check=True, capture_output=True)
+        else:
+            subprocess.run([self.binary, "--no-defaults", "--initialize-insecure", f"--datadir={self.datadir}"] + user,
+                           check=True, capture_output=True)
+        self.process = subprocess.Popen(
+            [self.binary, "--no-defaults", f"--datadir={self.datadir}", f"--port={self.port}",
+             "--bind-address=127.0.0.1", f"--socket={os.path.join(self.datadir, 'mysqld.sock')}",
+             f"--pid-file={os.path.join(self.datadir, 'mysqld.pid')}"] + user + self.options,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            try:
+                mysql.connector.connect(host="127.0.0.1", port=self.port, user="root", password="").close()
+                return
+            except mysql.connector.Error:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    sys.exit(f"{self.binary} did not start; see the error log in a kept data directory.")
+                time.sleep(0.5)
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.datadir:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+            self.datadir = None
+
+# Function to find a widget by its label
+def find(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+# Function to summarize latencies (ms)
+def summarize(latencies):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        # Nearest rank
+        return latencies[min(len(latencies) - 1, max(0, round(p / 100 * len(latencies) + 0.5) - 1))]
+
+    return {"samples": len(latencies), "p50": percentile(50), "p90": percentile(90), "p99": percentile(99),
+            "mean": sum(latencies) / len(latencies), "max": latencies[-1]}
+
+# Function to get the peak resident set size of this process in MB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+# Function to add the options every benchmark takes: the server to start or use, and the run settings
+def add_common_arguments(parser):
+    parser.add_argument("--server-binary", help="mysqld or mariadbd to start (default: found on PATH)")
+    parser.add_argument("--server-option", action="append", default=[],
+                        help="extra server option, e.g. --server-option=--innodb-buffer-pool-size=1G")
+    parser.add_argument("--host", help="use this running server instead of starting one")
+    parser.add_argument("--port", type=int, default=3307)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+
+# Function to describe where a report was measured
+def environment_report(server_version):
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "server_version": server_version,
+        "python_version": platform.python_version(),
+        "streamlit_version": st.__version__,
+        "mysql_connector_version": mysql.connector.__version__,
+    }
+
+# Function to write a JSON report to a file, or to stdout
+def write_report(report, path=None):
+    output = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,215 @@
+# SQL script reading shared by the apps: statements are split from an uploaded file chunk by chunk
+# and INSERTs can be sent several to a round trip
+import codecs
+import re
+
+# Bytes read from an uploaded script at a time
+CHUNK_SIZE = 1 << 20
+INSERT_STATEMENT = re.compile(r"^(?:INSERT|REPLACE)\b", re.IGNORECASE)
+# Statements that would leave (or replace) the schema a script is loaded into, also inside a version
+# comment as mysqldump writes them: /*!40000 DROP DATABASE IF EXISTS `school`*/
+SCHEMA_STATEMENT = re.compile(r"^(?:/\*M?!\d*\s*)?(?:USE|(?:CREATE|DROP)\s+(?:DATABASE|SCHEMA))\b", re.IGNORECASE)
+# Strings, skipped, quoted names and the qualifier of a dotted name: `school`.`students`, school.students
+# or s.name
+QUALIFIED_NAME = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`((?:[^`]|``)*)`(\s*\.)?|"""
+                            r"""(?<![\w$.])([A-Za-z_$][\w$]*)\s*\.(?=\s*[`A-Za-z_$])""")
+# End of a quoted string or the next backslash escape inside it
+QUOTE_END = {"'": re.compile(r"['\\]"), '"': re.compile(r'["\\]')}
+
+# Function to run statements in one round trip as a multi-statement query
+def execute_statements(mycursor, statements):
+    if len(statements) == 1:
+        mycursor.execute(statements[0])
+        if mycursor.with_rows:
+            mycursor.fetchall()
+        return
+    sql = ";\n".join(statements)
+    try:
+        results = mycursor.execute(sql, multi=True)
+    except TypeError:
+        # Connector 9.2+ runs multi-statement strings directly and walks the results with nextset()
+        mycursor.execute(sql)
+        while True:
+            if mycursor.with_rows:
+                mycursor.fetchall()
+            if not mycursor.nextset():
+                break
+    else:
+        for result in results:
+            if result.with_rows:
+                result.fetchall()
+
+# Function to list the qualifiers of the dotted names in a statement. A schema.table name cannot be told
+# from a table.column one without the statement's tables, so both are listed.
+def name_qualifiers(statement):
+    qualifiers = []
+    for match in QUALIFIED_NAME.finditer(statement):
+        if match.group(2) is not None:
+            qualifiers.append(match.group(1).replace("``", "`"))
+        elif match.group(3) is not None:
+            qualifiers.append(match.group(3))
+    return qualifiers
+
+# Function to read statements from an uploaded script chunk by chunk, with the bytes read so far
+def iter_sql_statements(uploaded_file, chunk_size=CHUNK_SIZE):
+    uploaded_file.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    splitter = SQLStatementSplitter()
+    while True:
+        chunk = uploaded_file.read(chunk_size)
+        statements = splitter.feed(decoder.decode(chunk, final=not chunk))
+        if not chunk:
+            statements += splitter.close()
+        for statement in statements:
+            yield statement, uploaded_file.tell()
+        if not chunk:
+            break
+
+# Incremental SQL statement splitter: text is fed in chunks and complete statements come out.
+# Delimiters inside quotes, backticks and comments are ignored, DELIMITER lines change the
+# delimiter, plain comments are dropped and /*! ... */ version comments are kept.
+class SQLStatementSplitter:
+    def __init__(self, delimiter=";"):
+        self._buffer = ""
+        self._parts = []
+        self._has_text = False
+        self._state = None
+        self._set_delimiter(delimiter)
+
+    def _set_delimiter(self, delimiter):
+        self.delimiter = delimiter
+        self._token = re.compile(re.escape(delimiter) + r"""|['"`#]|--(?=\s|$)|/\*""")
+        # Fast path: a run of plain text and complete quoted strings that cannot hold a token.
+        # Every lookahead needs a real character, so a run never ends where a token might start.
+        first = re.escape(delimiter[0])
+        self._run = re.compile(
+            rf"""(?:(?=.{{{len(delimiter)}}})(?!{re.escape(delimiter)})"""
+            rf"""(?:[^'"`#/\-{first}]+|'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`"""
+            rf"""|/(?=[^*])|-(?=-\S|[^-])|{first}))+""",
+            re.DOTALL
+        )
+        # Characters a token may need to be recognised, so a chunk never ends inside one
+        self._lookahead = max(len(delimiter), 3)
+
+    def feed(self, text):
+        self._buffer += text
+        return self._split(final=False)
+
+    def close(self):
+        statements = self._split(final=True)
+        self._end_statement(statements)
+        return statements
+
+    def _append(self, text):
+        if text:
+            self._parts.append(text)
+            if not self._has_text and not text.isspace():
+                self._has_text = True
+
+    def _end_statement(self, statements):
+        statement = "".join(self._parts).strip()
+        if statement:
+            statements.append(statement)
+        self._parts = []
+        self._has_text = False
+
+    def _split(self, final):
+        statements = []
+        buffer = self._buffer
+        end = len(buffer)
+        pos = 0
+        while pos < end:
+            state = self._state
+            if state is None:
+                if not self._has_text:
+                    # Skip blank space between statements and look for a DELIMITER command
+                    while pos < end and buffer[pos].isspace():
+                        pos += 1
+                    if pos >= end or (not final and end - pos < 10):
+                        break
+                    if buffer[pos:pos + 9].upper() == "DELIMITER" and buffer[pos + 9:pos + 10].isspace():
+                        line_end = buffer.find("\n", pos)
+                        if line_end == -1:
+                            if not final:
+                                break
+                            line_end = end
+                        words = buffer[pos + 9:line_end].split()
+                        if words:
+                            self._set_delimiter(words[0])
+                        pos = line_end + 1
+                        continue
+                limit = end if final else end - self._lookahead
+                run = self._run.match(buffer, pos, max(limit, pos))
+                if run:
+                    self._append(run.group())
+                    pos = run.end()
+                match = self._token.search(buffer, pos)
+                if match is None or match.start() >= limit:
+                    if limit > pos:
+                        self._append(buffer[pos:limit])
+                        pos = limit
+                    break
+                self._append(buffer[pos:match.start()])
+                token = match.group()
+                pos = match.end()
+                if token == self.delimiter:
+                    self._end_statement(statements)
+                elif token in ("'", '"', "`"):
+                    self._append(token)
+                    self._state = token
+                elif token == "/*":
+                    if buffer.startswith("!", pos):
+                        # Version comment: executed by the server, so it stays in the statement
+                        self._append("/*")
+                        self._state = "/*!"
+                    else:
+                        self._state = "/*"
+                else:
+                    self._state = "--"
+            elif state in ("'", '"', "`"):
+                # Backslash escapes apply inside strings but not inside backtick identifiers
+                if state == "`":
+                    close = buffer.find(state, pos)
+                else:
+                    match = QUOTE_END[state].search(buffer, pos)
+                    close = match.start() if match else -1
+                if close == -1:
+                    self._append(buffer[pos:end])
+                    pos = end
+                    break
+                if close + 1 >= end and not final:
+                    # Need the next character to tell an escape or doubled quote from the closing quote
+                    self._append(buffer[pos:close])
+                    pos = close
+                    break
+                if buffer[close] == "\\" or buffer.startswith(state, close + 1):
+                    self._append(buffer[pos:close + 2])
+                    pos = close + 2
+                else:
+                    self._append(buffer[pos:close + 1])
+                    pos = close + 1
+                    self._state = None
+            elif state == "--":
+                line_end = buffer.find("\n", pos)
+                if line_end == -1:
+                    pos = end
+                    break
+                pos = line_end
+                self._state = None
+            else:
+                comment_end = buffer.find("*/", pos)
+                if comment_end == -1:
+                    # Keep a trailing '*' in case the next chunk starts with '/'
+                    keep = end - 1 if not final else end
+                    if state == "/*!":
+                        self._append(buffer[pos:max(keep, pos)])
+                    pos = max(keep, pos)
+                    break
+                if state == "/*!":
+                    self._append(buffer[pos:comment_end + 2])
+                else:
+                    self._append(" ")
+                pos = comment_end + 2
+                self._state = None
+        self._buffer = buffer[pos:]
+        return statements
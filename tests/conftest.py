@@ -0,0 +1,8 @@
+# Both apps are scripts in their own folders; make their modules importable from the tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in (ROOT, os.path.join(ROOT, "MySQL_operations"), os.path.join(ROOT, "Text_2_SQL")):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
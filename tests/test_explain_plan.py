@@ -0,0 +1,66 @@
+# Rows examined per table from EXPLAIN FORMAT=JSON plans, in Text_2_SQL/generated_sql.py
+import pytest
+
+from generated_sql import explain_plan_tables
+
+
+def summary(plan):
+    return [(table["table"], table["access_type"], table["rows"], table["examined"])
+            for table in explain_plan_tables(plan)]
+
+
+def test_mysql_single_table_scan():
+    plan = {"query_block": {"select_id": 1, "cost_info": {"query_cost": "10100.25"},
+                            "table": {"table_name": "students", "access_type": "ALL",
+                                      "rows_examined_per_scan": 100000, "rows_produced_per_join": 10000,
+                                      "filtered": "10.00"}}}
+    assert summary(plan) == [("students", "ALL", 100000, 100000)]
+
+
+def test_mysql_nested_loop_multiplies_by_rows_produced():
+    plan = {"query_block": {"select_id": 1, "nested_loop": [
+        {"table": {"table_name": "c", "access_type": "ALL", "rows_examined_per_scan": 5,
+                   "rows_produced_per_join": 5, "filtered": "100.00"}},
+        {"table": {"table_name": "s", "access_type": "ref", "key": "class", "rows_examined_per_scan": 2000,
+                   "rows_produced_per_join": 10000, "filtered": "100.00"}},
+    ]}}
+    assert summary(plan) == [("c", "ALL", 5, 5), ("s", "ref", 2000, 10000)]
+
+
+def test_mariadb_cross_join_uses_rows_and_filtered():
+    plan = {"query_block": {"select_id": 1, "nested_loop": [
+        {"table": {"table_name": "a", "access_type": "ALL", "rows": 1000, "filtered": 50}},
+        {"block-nl-join": {"table": {"table_name": "b", "access_type": "ALL", "rows": 400, "filtered": 100},
+                           "buffer_type": "flat", "join_type": "BNL"}},
+    ]}}
+    # b is scanned once for each of the 500 rows a passes on
+    assert summary(plan) == [("a", "ALL", 1000, 1000), ("b", "ALL", 400, 200000)]
+
+
+def test_subqueries_are_counted_on_their_own():
+    subquery = {"dependent": False, "cacheable": True, "query_block": {
+        "select_id": 2, "table": {"table_name": "scores", "access_type": "index",
+                                  "rows_examined_per_scan": 300, "rows_produced_per_join": 300}}}
+    plan = {"query_block": {"select_id": 1, "table": {
+        "table_name": "students", "access_type": "range", "rows_examined_per_scan": 20,
+        "rows_produced_per_join": 20, "attached_subqueries": [subquery]}}}
+    assert summary(plan) == [("students", "range", 20, 20), ("scores", "index", 300, 300)]
+
+
+def test_ordering_operation_wraps_the_join():
+    plan = {"query_block": {"select_id": 1, "ordering_operation": {"using_filesort": True, "grouping_operation": {
+        "nested_loop": [
+            {"table": {"table_name": "c", "access_type": "ALL", "rows_examined_per_scan": 5,
+                       "rows_produced_per_join": 5}},
+            {"table": {"table_name": "s", "access_type": "ALL", "rows_examined_per_scan": 1000,
+                       "rows_produced_per_join": 5000}},
+        ]}}}}
+    assert summary(plan) == [("c", "ALL", 5, 5), ("s", "ALL", 1000, 5000)]
+
+
+@pytest.mark.parametrize("plan", [
+    {"query_block": {"select_id": 1, "message": "No tables used"}},
+    {"query_block": {"select_id": 1, "table": {"message": "Impossible WHERE"}}},
+])
+def test_plans_without_tables(plan):
+    assert explain_plan_tables(plan) == []
@@ -0,0 +1,54 @@
+# Checks of model-generated SQL in Text_2_SQL/generated_sql.py
+import pytest
+
+from generated_sql import prepare_generated_sql
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM t", "SELECT * FROM t LIMIT 100"),
+    ("```sql\nSELECT * FROM t;\n```", "SELECT * FROM t LIMIT 100"),
+    ("SELECT * FROM t LIMIT 5", "SELECT * FROM t LIMIT 5"),
+    ("SELECT * FROM t LIMIT 500", "SELECT * FROM t LIMIT 100"),
+    ("SELECT * FROM t LIMIT 10, 500", "SELECT * FROM t LIMIT 10, 100"),
+    ("SELECT * FROM t LIMIT 500 OFFSET 10", "SELECT * FROM t LIMIT 100 OFFSET 10"),
+    ("WITH a AS (SELECT 1) SELECT * FROM a", "WITH a AS (SELECT 1) SELECT * FROM a LIMIT 100"),
+    # Keywords inside literals and quoted names are not clauses
+    ("SELECT 'a; b INTO c' AS `for update` FROM t", "SELECT 'a; b INTO c' AS `for update` FROM t LIMIT 100"),
+    ("SELECT * FROM t WHERE name = 'LIMIT 5'", "SELECT * FROM t WHERE name = 'LIMIT 5' LIMIT 100"),
+    ("WITH a (x) AS (SELECT 1), `b c` AS (SELECT 2) (SELECT * FROM a)",
+     "WITH a (x) AS (SELECT 1), `b c` AS (SELECT 2) (SELECT * FROM a) LIMIT 100"),
+    # Comments are dropped so they cannot swallow the appended LIMIT
+    ("SELECT * FROM t -- every row", "SELECT * FROM t LIMIT 100"),
+    ("SELECT * FROM t # every row;", "SELECT * FROM t LIMIT 100"),
+    ("SELECT * FROM t /* every row */", "SELECT * FROM t LIMIT 100"),
+    ("SELECT * FROM t LIMIT 500 -- at most 500", "SELECT * FROM t LIMIT 100"),
+    ("SELECT '-- not a comment' FROM t", "SELECT '-- not a comment' FROM t LIMIT 100"),
+    ("SELECT 1--1 FROM t", "SELECT 1--1 FROM t LIMIT 100"),
+])
+def test_prepare_generated_sql_bounds_rows(sql, expected):
+    assert prepare_generated_sql(sql, 100) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t; DROP TABLE t",
+    "DELETE FROM t",
+    "UPDATE t SET a = 1",
+    "SELECT * FROM t INTO OUTFILE '/tmp/t.csv'",
+    "SELECT * INTO DUMPFILE '/tmp/t' FROM t",
+    "SELECT COUNT(*) INTO @rows FROM t",
+    "SELECT * FROM t FOR UPDATE",
+    "SELECT * FROM t FOR UPDATE LIMIT 5",
+    "SELECT * FROM t FOR SHARE",
+    "SELECT * FROM t LOCK IN SHARE MODE",
+    # Statements after a WITH list other than SELECT
+    "WITH a AS (SELECT 1) DELETE FROM t",
+    "WITH a (x) AS (SELECT 1), b AS (SELECT 2) UPDATE t SET c = 1",
+    "WITH RECURSIVE a AS (SELECT 1) INSERT INTO t SELECT * FROM a",
+    # The server runs the body of version comments
+    "SELECT * FROM t /*!50000 INTO OUTFILE '/tmp/t.csv' */",
+    "SELECT 1--1 INTO @rows",
+    "SELECT * FROM t /* never closed",
+])
+def test_prepare_generated_sql_rejects_unsafe_sql(sql):
+    with pytest.raises(ValueError):
+        prepare_generated_sql(sql, 100)
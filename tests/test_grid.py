@@ -0,0 +1,75 @@
+# Batched saving of grid edits in MySQL_operations/MySQL.py
+from MySQL import apply_grid_changes
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.connection.statements.append((sql, list(params)))
+        self.rowcount = self.connection.matched.pop(0) if self.connection.matched else 0
+
+    def executemany(self, sql, params):
+        self.connection.statements.append((sql, list(params)))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, matched=()):
+        self.statements = []
+        self.matched = list(matched)
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+GRID = {"columns": ["id", "name", "score"], "rows": [[1, "a", 10], [2, "b", 20], [3, "c", 30]],
+        "versions": ["v1", "v2", "v3"]}
+VERSION = "MD5(JSON_ARRAY(`id`, `name`, `score`))"
+
+
+def test_deletes_are_one_statement_found_by_key():
+    connection = FakeConnection(matched=[2])
+    assert apply_grid_changes(connection, "db", "t", ["id"], GRID, {"deleted_rows": [0, 2]}) == 0
+    assert connection.statements == [
+        (f"DELETE FROM `db`.`t` WHERE (`id`) IN ((%s), (%s)) AND {VERSION} IN (%s, %s)", [1, 3, "v1", "v3"])]
+    assert connection.committed
+
+
+def test_updates_are_one_statement_with_a_case_per_column():
+    connection = FakeConnection(matched=[2])
+    changes = {"edited_rows": {"0": {"name": "x"}, "1": {"name": "y", "score": 25}}}
+    assert apply_grid_changes(connection, "db", "t", ["id"], GRID, changes) == 0
+    sql, params = connection.statements[0]
+    assert sql == ("UPDATE `db`.`t` SET "
+                   "`name` = CASE WHEN (`id`) = (%s) THEN %s WHEN (`id`) = (%s) THEN %s ELSE `name` END, "
+                   "`score` = CASE WHEN (`id`) = (%s) THEN %s ELSE `score` END "
+                   f"WHERE (`id`) IN ((%s), (%s)) AND {VERSION} IN (%s, %s)")
+    assert params == [1, "x", 2, "y", 2, 25, 1, 2, "v1", "v2"]
+
+
+def test_composite_keys_are_matched_as_row_constructors():
+    grid = {"columns": ["a", "b", "note"], "rows": [[1, 1, "x"], [1, 2, "y"]], "versions": ["v1", "v2"]}
+    connection = FakeConnection(matched=[2])
+    apply_grid_changes(connection, "db", "t", ["a", "b"], grid, {"deleted_rows": [0, 1]})
+    sql, params = connection.statements[0]
+    assert "WHERE (`a`, `b`) IN ((%s, %s), (%s, %s)) AND MD5(" in sql
+    assert params == [1, 1, 1, 2, "v1", "v2"]
+
+
+def test_rows_changed_by_someone_else_roll_back():
+    # Only one of the two deleted rows still has its loaded version
+    connection = FakeConnection(matched=[1])
+    assert apply_grid_changes(connection, "db", "t", ["id"], GRID, {"deleted_rows": [0, 1]}) == 1
+    assert connection.rolled_back and not connection.committed
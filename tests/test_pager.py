@@ -0,0 +1,92 @@
+# Page boundary math of the keyset pager in MySQL_operations/MySQL.py
+import pytest
+
+from MySQL import fetch_page, page_window
+
+
+class FakeCursor:
+    def __init__(self, columns, rows):
+        self.description = [(column,) for column in columns]
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        # The server honours the LIMIT (page size + 1 for the look-ahead row)
+        self.rows = self.rows[:params[-1] if "OFFSET" not in sql else params[-2]]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cursor_instance = FakeCursor(["id", "name"], rows)
+
+    def cursor(self, buffered=None):
+        return self.cursor_instance
+
+
+def table_rows(count):
+    return [(i, f"row {i}") for i in range(1, count + 1)]
+
+
+@pytest.mark.parametrize("limit, page_number, expected", [
+    (None, 1, (10, False)),
+    (None, 7, (10, False)),
+    (25, 1, (10, False)),
+    (25, 3, (5, True)),
+    # A LIMIT that is an exact multiple of the page size ends on a full page
+    (20, 1, (10, False)),
+    (20, 2, (10, True)),
+    (10, 1, (10, True)),
+    (5, 1, (5, True)),
+    # A pager left past the LIMIT fetches nothing
+    (20, 3, (0, True)),
+])
+def test_page_window(limit, page_number, expected):
+    assert page_window(10, limit, page_number) == expected
+
+
+def test_fetch_page_returns_next_key_after_full_page():
+    columns, rows, next_start = fetch_page(FakeConnection(table_rows(25)), "t", ["id"], None, 10)
+    assert columns == ["id", "name"]
+    assert [row[0] for row in rows] == list(range(1, 11))
+    assert next_start == (10,)
+
+
+def test_fetch_page_last_page_has_no_next_key():
+    _, rows, next_start = fetch_page(FakeConnection(table_rows(10)), "t", ["id"], None, 10)
+    assert len(rows) == 10
+    assert next_start is None
+
+
+def test_fetch_page_empty_page_has_no_next_key():
+    _, rows, next_start = fetch_page(FakeConnection(table_rows(25)), "t", ["id"], (20,), 0)
+    assert rows == []
+    assert next_start is None
+
+
+def test_fetch_page_continues_after_start_key():
+    connection = FakeConnection(table_rows(5))
+    fetch_page(connection, "t", ["id"], (20,), 4)
+    sql, params = connection.cursor_instance.executed[0]
+    assert "(`id`) > (%s)" in sql
+    assert params == (20, 5)
+
+
+def test_fetch_page_without_key_pages_by_offset():
+    connection = FakeConnection(table_rows(25))
+    _, rows, next_start = fetch_page(connection, "t", [], 10, 10)
+    sql, params = connection.cursor_instance.executed[0]
+    assert sql.endswith("LIMIT %s OFFSET %s")
+    assert params == (11, 10)
+    assert next_start == 20
@@ -0,0 +1,56 @@
+# Query log entries of prepared statements in MySQL_operations/MySQL.py
+from MySQL import InstrumentedConnection, InstrumentedCursor, explain_statement
+
+
+class FakeCursor:
+    def __init__(self, statement=None):
+        self.statement = statement
+        self.executed = []
+        self.rowcount = 0
+        self.with_rows = False
+        self.description = [("id",)]
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, *args, **kwargs):
+        return self._cursor
+
+
+def rerun_log():
+    return {"statements": [], "totals": {"statements": 0, "latency_ms": 0.0, "rows": 0, "bytes": 0}}
+
+
+def test_prepared_statements_are_logged_with_their_parameters():
+    connection = InstrumentedConnection(FakeConnection(FakeCursor()), rerun_log())
+    sql = "SELECT * FROM `t` WHERE `id` = %s"
+    InstrumentedCursor(FakeCursor(statement=sql), connection, prepared=True).execute(sql, (7,))
+    entry = connection.rerun_log["statements"][0]
+    assert entry["sql"] == sql
+    assert entry["params"] == [7]
+
+
+def test_plain_statements_are_logged_interpolated_without_parameters():
+    connection = InstrumentedConnection(FakeConnection(FakeCursor()), rerun_log())
+    cursor = InstrumentedCursor(FakeCursor(statement="SELECT 7"), connection)
+    cursor.execute("SELECT %s", (7,))
+    assert connection.rerun_log["statements"][0]["sql"] == "SELECT 7"
+    assert "params" not in connection.rerun_log["statements"][0]
+
+
+def test_explain_binds_the_logged_parameters():
+    cursor = FakeCursor()
+    entry = {"sql": "SELECT * FROM `t` WHERE `id` = %s", "database": "db", "params": [7]}
+    explain_statement(FakeConnection(cursor), entry)
+    assert cursor.executed == [("USE `db`", ()), ("EXPLAIN SELECT * FROM `t` WHERE `id` = %s", (7,))]
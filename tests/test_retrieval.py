@@ -0,0 +1,68 @@
+# BM25 retrieval of tables and examples in Text_2_SQL/retrieval.py
+import pytest
+
+from retrieval import BM25Index, table_tokens, tokenize
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("StudentScores", ["student", "score"]),
+    ("student_scores", ["student", "score"]),
+    ("HTTPRequests per day", ["http", "request", "per", "day"]),
+    ("Class address glass", ["class", "address", "glass"]),
+    ("top 10 users", ["top", "10", "user"]),
+    (None, []),
+])
+def test_tokenize(text, expected):
+    assert tokenize(text) == expected
+
+
+def test_table_tokens_weights_name_and_reads_columns_and_references():
+    context = {"columns": [{"name": "studentId", "comment": "Who took the exam"}],
+               "foreign_keys": [("studentId", "Students", "id")]}
+    tokens = table_tokens("ExamScores", context)
+    assert tokens.count("exam") == 3
+    assert tokens.count("score") == 2
+    assert "took" in tokens
+    assert tokens.count("student") == 2
+
+
+def build_index():
+    index = BM25Index()
+    index.add("students", tokenize("students student name age class"))
+    index.add("scores", tokenize("scores score student id subject marks"))
+    index.add("teachers", tokenize("teachers teacher name subject salary"))
+    return index
+
+
+def test_search_ranks_by_term_matches():
+    index = build_index()
+    assert index.search(tokenize("marks of each student"), 2) == ["scores", "students"]
+    assert index.search(tokenize("teacher salary"), 1) == ["teachers"]
+
+
+def test_search_ignores_unknown_terms_and_respects_k():
+    index = build_index()
+    assert index.search(tokenize("weather forecast"), 3) == []
+    assert len(index.search(tokenize("student teacher subject name"), 2)) == 2
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = build_index()
+    # "salary" is in one document, "name" in two
+    assert index.search(tokenize("name salary"), 1) == ["teachers"]
+
+
+def test_add_replaces_and_remove_drops_a_document():
+    index = build_index()
+    index.add("teachers", tokenize("teachers staff payroll"))
+    assert len(index) == 3
+    assert index.search(tokenize("salary"), 3) == []
+    assert index.search(tokenize("payroll"), 3) == ["teachers"]
+    index.remove("teachers")
+    index.remove("missing")
+    assert len(index) == 2
+    assert index.search(tokenize("payroll teacher"), 3) == []
+
+
+def test_empty_index_finds_nothing():
+    assert BM25Index().search(["student"], 5) == []
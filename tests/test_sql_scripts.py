@@ -0,0 +1,103 @@
+# Statement splitting of uploaded SQL scripts in sql_scripts.py, shared by both apps
+import io
+
+import pytest
+
+from sql_scripts import SCHEMA_STATEMENT, SQLStatementSplitter, iter_sql_statements, name_qualifiers
+
+SCRIPT = """-- Dump header
+/*!40101 SET NAMES utf8mb4 */;
+CREATE TABLE `a;b` (id INT, note TEXT); # trailing comment
+INSERT INTO `a;b` VALUES (1, 'it''s; fine'), (2, 'back\\'slash;'), (3, "double; quoted");
+/* a block comment; with a delimiter */
+DELIMITER $$
+CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END$$
+DELIMITER ;
+SELECT 1 - -1;
+SELECT 'unterminated at end'"""
+
+EXPECTED = [
+    "/*!40101 SET NAMES utf8mb4 */",
+    "CREATE TABLE `a;b` (id INT, note TEXT)",
+    "INSERT INTO `a;b` VALUES (1, 'it''s; fine'), (2, 'back\\'slash;'), (3, \"double; quoted\")",
+    "CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END",
+    "SELECT 1 - -1",
+    "SELECT 'unterminated at end'",
+]
+
+
+def split(text, chunk_size):
+    splitter = SQLStatementSplitter()
+    statements = []
+    for start in range(0, len(text), chunk_size):
+        statements += splitter.feed(text[start:start + chunk_size])
+    return statements + splitter.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, len(SCRIPT)])
+def test_splitter_is_independent_of_chunk_boundaries(chunk_size):
+    assert split(SCRIPT, chunk_size) == EXPECTED
+
+
+# Dash runs: only two dashes followed by whitespace start a comment, wherever they fall in the run
+DASH_SCRIPT = """SELECT 1 --- x;y
+;
+SELECT 2 ---- z; w
+;
+SELECT 3 ---x;
+SELECT 4 - -5;
+SELECT 5 -- ;
+SELECT 6 --"""
+
+DASH_EXPECTED = ["SELECT 1 -", "SELECT 2 --", "SELECT 3 ---x", "SELECT 4 - -5",
+                 # The comment hides the delimiter after it
+                 "SELECT 5 \nSELECT 6"]
+
+
+def test_splitter_splits_the_same_at_every_chunk_size():
+    for text, expected in ((SCRIPT, EXPECTED), (DASH_SCRIPT, DASH_EXPECTED)):
+        for chunk_size in range(1, len(text) + 1):
+            assert split(text, chunk_size) == expected, chunk_size
+
+
+def test_splitter_drops_comments_and_blank_statements():
+    assert split("-- only a comment\n;;  \n/* and another */;\n", 5) == []
+
+
+def test_splitter_needs_whitespace_after_double_dash():
+    assert split("SELECT 1--1;", 4) == ["SELECT 1--1"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+def test_iter_sql_statements_reports_bytes_read(chunk_size):
+    data = "SELECT 'é';\nSELECT 2;\n".encode("utf-8")
+    statements = list(iter_sql_statements(io.BytesIO(data), chunk_size))
+    assert [statement for statement, _ in statements] == ["SELECT 'é'", "SELECT 2"]
+    assert all(0 < bytes_read <= len(data) for _, bytes_read in statements)
+    assert statements[-1][1] == len(data)
+
+
+@pytest.mark.parametrize("statement, matches", [
+    ("USE `school`", True),
+    ("CREATE DATABASE school", True),
+    ("drop schema if exists school", True),
+    # mysqldump --databases writes these inside version comments
+    ("/*!40000 DROP DATABASE IF EXISTS `school`*/", True),
+    ("/*!32312 IF NOT EXISTS*/ CREATE DATABASE school", False),
+    ("/*!40000 ALTER TABLE `students` DISABLE KEYS */", False),
+    ("CREATE TABLE `database` (id INT)", False),
+])
+def test_schema_statements(statement, matches):
+    assert bool(SCHEMA_STATEMENT.match(statement)) == matches
+
+
+@pytest.mark.parametrize("statement, qualifiers", [
+    ("DROP TABLE `school`.`students`", ["school"]),
+    ("INSERT INTO `other`.`t` VALUES (1.5, 'a.b', \"c.d\")", ["other"]),
+    ("INSERT INTO other . t VALUES (1)", ["other"]),
+    ("/*!50001 CREATE VIEW `v` AS SELECT `s`.`name` FROM `school`.`students` `s` */", ["s", "school"]),
+    ("CREATE TABLE `odd. name` (id INT)", []),
+    ("SELECT `a``b`.c", ["a`b"]),
+])
+def test_name_qualifiers(statement, qualifiers):
+    assert name_qualifiers(statement) == qualifiers